@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        """Connects SQL query recording of request metrics."""
+        from api.metrics import install_query_recorder
+
+        connection_created.connect(install_query_recorder)
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+from api.cache import is_cache_shared
+
+TOKEN_KEY = 'auth_token:{}'
+
+
+def evict_tokens(keys):
+    """Removes cached tokens of the given keys."""
+    cache.delete_many([TOKEN_KEY.format(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication keeping tokens with their owners in the cache.
+
+    Entries live for AUTH_TOKEN_CACHE_TIMEOUT seconds and are evicted by
+    signals when the token is deleted or its user is saved or deleted.
+    Evictions must reach every worker, so tokens are cached only when
+    the cache is shared by them.
+    """
+
+    def authenticate_credentials(self, key):
+        """Method returns the owner and the cached or loaded token."""
+        if not is_cache_shared():
+            return super().authenticate_credentials(key)
+        cache_key = TOKEN_KEY.format(key)
+        token = cache.get(cache_key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(cache_key, token, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+        return token.user, token
@@ -0,0 +1,439 @@
+import base64
+import io
+import random
+import time
+from itertools import count, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from recipes.counters import rebuild_counters
+from recipes.feed import rebuild_feeds
+from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
+                            ShoppingCart, Tag)
+from recipes.shopping_list import get_cart_digest, get_shopping_list
+from users.models import Follow, User
+
+PASSWORD = 'benchmark-password'
+METRICS_TOKEN = 'benchmark-metrics-token'
+BATCH_SIZE = 1000
+DATASET = {
+    'users': 200,
+    'recipes': 2000,
+    'ingredients': 2000,
+    'tags': 10,
+    'follows': 2000,
+    'favorites': 5000,
+    'carts': 2000,
+}
+INGREDIENTS_PER_RECIPE = 8
+TAGS_PER_RECIPE = 2
+
+# Authorization headers by the credentials an endpoint is requested with.
+AUTHORIZATION = {
+    'user': 'Token {token}',
+    'login': 'Token {login_token}',
+    'metrics': 'Bearer {metrics_token}',
+}
+
+# Requests made in this order on every iteration. 'path' and 'data' are
+# formatted with ids of the seeded objects, 'save' stores a 'field' of the
+# response body ('id' by default) for the following requests, 'auth' names
+# the credentials. 'budget' is the maximum number of SQL queries a request
+# may make with warm caches and 'cold_budget' one made right after the
+# cache is cleared, the same by default; 'cold_status' is the status then.
+# Unfiltered lists have one query spare for the PostgreSQL row estimate.
+# Authenticated requests include the token lookup, as tokens are not
+# cached by the default process cache.
+ENDPOINTS = (
+    {'name': 'tags-list', 'method': 'get', 'path': '/api/tags/',
+     'budget': 1, 'cold_budget': 2},
+    {'name': 'tags-detail', 'method': 'get', 'path': '/api/tags/{tag}/',
+     'budget': 1, 'cold_budget': 2},
+    {'name': 'ingredients-list', 'method': 'get',
+     'path': '/api/ingredients/', 'budget': 1, 'cold_budget': 2},
+    {'name': 'ingredients-search', 'method': 'get',
+     'path': '/api/ingredients/?name={ingredient_prefix}',
+     'budget': 1, 'cold_budget': 2},
+    {'name': 'ingredients-detail', 'method': 'get',
+     'path': '/api/ingredients/{ingredient}/', 'budget': 1, 'cold_budget': 2},
+    {'name': 'recipes-list', 'method': 'get', 'path': '/api/recipes/',
+     'budget': 6, 'cold_budget': 9},
+    {'name': 'recipes-list-anonymous', 'method': 'get',
+     'path': '/api/recipes/', 'anonymous': True,
+     'budget': 4, 'cold_budget': 5},
+    {'name': 'recipes-list-uncounted', 'method': 'get',
+     'path': '/api/recipes/?count=false', 'budget': 3, 'cold_budget': 8},
+    {'name': 'recipes-list-cursor', 'method': 'get',
+     'path': '/api/recipes/?cursor=', 'budget': 3, 'cold_budget': 8},
+    {'name': 'recipes-list-tags', 'method': 'get',
+     'path': '/api/recipes/?tags={tag_slug}', 'budget': 5, 'cold_budget': 10},
+    {'name': 'recipes-list-all-tags', 'method': 'get',
+     'path': '/api/recipes/?tags={tag_slug}&tags_mode=all',
+     'budget': 5, 'cold_budget': 10},
+    {'name': 'recipes-list-favorited', 'method': 'get',
+     'path': '/api/recipes/?is_favorited=1', 'budget': 4, 'cold_budget': 9},
+    {'name': 'recipes-list-in-cart', 'method': 'get',
+     'path': '/api/recipes/?is_in_shopping_cart=1',
+     'budget': 4, 'cold_budget': 9},
+    {'name': 'recipes-search', 'method': 'get',
+     'path': '/api/recipes/?search={recipe_word}',
+     'budget': 5, 'cold_budget': 10},
+    {'name': 'recipes-detail', 'method': 'get',
+     'path': '/api/recipes/{recipe}/', 'budget': 3, 'cold_budget': 8},
+    {'name': 'recipes-feed', 'method': 'get', 'path': '/api/recipes/feed/',
+     'budget': 3, 'cold_budget': 8},
+    {'name': 'recipes-create', 'method': 'post', 'path': '/api/recipes/',
+     'data': 'recipe_payload', 'status': 201, 'save': 'new_recipe',
+     'budget': 16, 'cold_budget': 19},
+    {'name': 'recipes-update', 'method': 'patch',
+     'path': '/api/recipes/{new_recipe}/', 'data': 'recipe_update',
+     'budget': 10, 'cold_budget': 13},
+    {'name': 'recipes-delete', 'method': 'delete',
+     'path': '/api/recipes/{new_recipe}/', 'status': 204, 'budget': 13},
+    {'name': 'favorite-add', 'method': 'post',
+     'path': '/api/recipes/{other_recipe}/favorite/', 'status': 201,
+     'budget': 7},
+    {'name': 'favorite-remove', 'method': 'delete',
+     'path': '/api/recipes/{other_recipe}/favorite/', 'status': 204,
+     'budget': 5},
+    {'name': 'favorite-bulk-add', 'method': 'post',
+     'path': '/api/recipes/favorite/', 'data': 'bulk_recipes',
+     'status': 201, 'budget': 7},
+    {'name': 'favorite-bulk-remove', 'method': 'delete',
+     'path': '/api/recipes/favorite/', 'data': 'bulk_recipes',
+     'status': 204, 'budget': 7},
+    {'name': 'cart-add', 'method': 'post',
+     'path': '/api/recipes/{other_recipe}/shopping_cart/', 'status': 201,
+     'budget': 7},
+    {'name': 'cart-remove', 'method': 'delete',
+     'path': '/api/recipes/{other_recipe}/shopping_cart/', 'status': 204,
+     'budget': 5},
+    {'name': 'cart-bulk-add', 'method': 'post',
+     'path': '/api/recipes/shopping_cart/', 'data': 'bulk_recipes',
+     'status': 201, 'budget': 7},
+    {'name': 'cart-bulk-remove', 'method': 'delete',
+     'path': '/api/recipes/shopping_cart/', 'data': 'bulk_recipes',
+     'status': 204, 'budget': 7},
+    {'name': 'cart-download', 'method': 'get',
+     'path': '/api/recipes/download_shopping_cart/', 'budget': 2},
+    {'name': 'cart-job', 'method': 'get',
+     'path': '/api/recipes/download_shopping_cart/?job={cart_digest}',
+     'cold_status': 404, 'budget': 1},
+    {'name': 'users-list', 'method': 'get', 'path': '/api/users/',
+     'budget': 4},
+    {'name': 'users-detail', 'method': 'get', 'path': '/api/users/{author}/',
+     'budget': 3},
+    {'name': 'users-me', 'method': 'get', 'path': '/api/users/me/',
+     'budget': 1},
+    {'name': 'subscriptions', 'method': 'get',
+     'path': '/api/users/subscriptions/?recipes_limit=3', 'budget': 4},
+    {'name': 'subscribe', 'method': 'post',
+     'path': '/api/users/{other_author}/subscribe/?recipes_limit=3',
+     'status': 201, 'budget': 11},
+    {'name': 'unsubscribe', 'method': 'delete',
+     'path': '/api/users/{other_author}/subscribe/', 'status': 204,
+     'budget': 9},
+    {'name': 'users-create', 'method': 'post', 'path': '/api/users/',
+     'data': 'new_user', 'anonymous': True, 'status': 201, 'budget': 5},
+    {'name': 'token-login', 'method': 'post', 'path': '/api/auth/token/login/',
+     'data': 'credentials', 'anonymous': True, 'save': 'login_token',
+     'field': 'auth_token', 'budget': 5},
+    {'name': 'token-logout', 'method': 'post',
+     'path': '/api/auth/token/logout/', 'auth': 'login', 'status': 204,
+     'budget': 4},
+    {'name': 'metrics', 'method': 'get', 'path': '/api/metrics/',
+     'auth': 'metrics', 'budget': 0},
+)
+
+# Tag and author changes invalidate cached pages and fragments, so they
+# are measured after the other endpoints instead of on every iteration.
+CATALOGUE_ENDPOINTS = (
+    {'name': 'set-password', 'method': 'post',
+     'path': '/api/users/set_password/', 'data': 'password_change',
+     'status': 204, 'budget': 4},
+    {'name': 'tags-create', 'method': 'post', 'path': '/api/tags/',
+     'data': 'tag_payload', 'status': 201, 'save': 'new_tag', 'budget': 5},
+    {'name': 'tags-update', 'method': 'patch', 'path': '/api/tags/{new_tag}/',
+     'data': 'tag_update', 'budget': 4},
+    {'name': 'tags-delete', 'method': 'delete',
+     'path': '/api/tags/{new_tag}/', 'status': 204, 'budget': 5},
+)
+
+ALL_ENDPOINTS = ENDPOINTS + CATALOGUE_ENDPOINTS
+
+
+def get_image_payload():
+    """Returns a small PNG image encoded as a data URL."""
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), 'orange').save(buffer, 'PNG')
+    encoded = base64.b64encode(buffer.getvalue()).decode('ascii')
+    return f'data:image/png;base64,{encoded}'
+
+
+def sample_pairs(rng, left, right, count, exclude_same=False):
+    """Returns up to 'count' distinct random pairs of left and right ids."""
+    pairs = set()
+    attempts = 0
+    while len(pairs) < count and attempts < count * 10:
+        attempts += 1
+        pair = (rng.choice(left), rng.choice(right))
+        if not exclude_same or pair[0] != pair[1]:
+            pairs.add(pair)
+    return sorted(pairs)
+
+
+def seed_dataset(sizes, seed=0):
+    """Fills an empty database with a synthetic dataset of given sizes.
+
+    Rows are bulk inserted, so counters and feeds are rebuilt at the end
+    instead of being maintained by signals.
+    """
+    rng = random.Random(seed)
+    password = make_password(PASSWORD)
+    User.objects.bulk_create((
+        User(
+            username=f'user{index}', email=f'user{index}@example.com',
+            first_name='Имя', last_name='Фамилия', password=password
+        )
+        for index in range(sizes['users'])
+    ), batch_size=BATCH_SIZE)
+    user_ids = list(User.objects.values_list('id', flat=True))
+    Ingredient.objects.bulk_create((
+        Ingredient(name=f'ингредиент {index}', measurement_unit='г')
+        for index in range(sizes['ingredients'])
+    ), batch_size=BATCH_SIZE)
+    ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+    Tag.objects.bulk_create(
+        Tag(name=f'тег {index}', color=f'#{index:06X}', slug=f'tag{index}')
+        for index in range(sizes['tags'])
+    )
+    tag_ids = list(Tag.objects.values_list('id', flat=True))
+    Recipe.objects.bulk_create((
+        Recipe(
+            author_id=rng.choice(user_ids), name=f'Рецепт номер {index}',
+            text='Смешать все ингредиенты и запекать до готовности.',
+            cooking_time=rng.randint(5, 120),
+            image='recipes/image/benchmark.png',
+        )
+        for index in range(sizes['recipes'])
+    ), batch_size=BATCH_SIZE)
+    recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+    IngredientRecipe.objects.bulk_create((
+        IngredientRecipe(
+            recipe_id=recipe_id, ingredient_id=ingredient_id,
+            amount=rng.randint(1, 500)
+        )
+        for recipe_id in recipe_ids
+        for ingredient_id in rng.sample(
+            ingredient_ids, min(INGREDIENTS_PER_RECIPE, len(ingredient_ids))
+        )
+    ), batch_size=BATCH_SIZE)
+    Recipe.tags.through.objects.bulk_create((
+        Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+        for recipe_id in recipe_ids
+        for tag_id in rng.sample(tag_ids, min(TAGS_PER_RECIPE, len(tag_ids)))
+    ), batch_size=BATCH_SIZE)
+    Follow.objects.bulk_create((
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id, author_id in sample_pairs(
+            rng, user_ids, user_ids, sizes['follows'], exclude_same=True
+        )
+    ), batch_size=BATCH_SIZE)
+    for model, size in ((Favorite, 'favorites'), (ShoppingCart, 'carts')):
+        model.objects.bulk_create((
+            model(user_id=user_id, recipe_id=recipe_id)
+            for user_id, recipe_id in sample_pairs(
+                rng, user_ids, recipe_ids, sizes[size]
+            )
+        ), batch_size=BATCH_SIZE)
+    rebuild_counters()
+    rebuild_feeds()
+
+
+def get_user_payload(number):
+    """Returns registration data of a new user."""
+    return {
+        'email': f'newcomer{number}@example.com',
+        'username': f'newcomer{number}',
+        'first_name': 'Имя',
+        'last_name': 'Фамилия',
+        'password': PASSWORD,
+    }
+
+
+def get_context():
+    """Returns ids and payloads used to format benchmark requests.
+
+    Callable payloads are called on every request, so each one is new.
+    """
+    user = User.objects.filter(
+        follower__isnull=False, shopping_list__isnull=False
+    ).order_by('id').first() or User.objects.order_by('id').first()
+    followed = Follow.objects.filter(user=user).values('author_id')
+    other_author = User.objects.exclude(id=user.id).exclude(
+        id__in=followed
+    ).order_by('id').first()
+    favorited = Favorite.objects.filter(user=user).values('recipe_id')
+    in_cart = ShoppingCart.objects.filter(user=user).values('recipe_id')
+    free_recipes = Recipe.objects.exclude(id__in=favorited).exclude(
+        id__in=in_cart
+    ).order_by('id').values_list('id', flat=True)
+    other_recipe, *bulk = islice(free_recipes, 11)
+    ingredient = Ingredient.objects.order_by('id').first()
+    tag = Tag.objects.order_by('id').first()
+    ingredient_ids = Ingredient.objects.order_by('id').values_list(
+        'id', flat=True
+    )[:INGREDIENTS_PER_RECIPE]
+    numbers = count()
+    return {
+        'user': user,
+        'tag': tag.id,
+        'tag_slug': tag.slug,
+        'ingredient': ingredient.id,
+        'ingredient_prefix': ingredient.name[:4],
+        'recipe': Recipe.objects.order_by('id').first().id,
+        'recipe_word': 'рецепт',
+        'author': other_author.id,
+        'other_author': other_author.id,
+        'other_recipe': other_recipe,
+        'bulk_recipes': {'recipes': bulk},
+        'cart_digest': get_cart_digest(list(get_shopping_list(user))),
+        'new_user': lambda: get_user_payload(next(numbers)),
+        'password_change': {
+            'current_password': PASSWORD, 'new_password': PASSWORD,
+        },
+        # Logging out deletes the token, so another user logs in.
+        'credentials': {'email': other_author.email, 'password': PASSWORD},
+        'tag_payload': {
+            'name': 'Новый тег', 'color': '#FFFFFF', 'slug': 'new-tag',
+        },
+        'tag_update': {'name': 'Изменённый тег'},
+        'recipe_payload': {
+            'name': 'Новый рецепт',
+            'text': 'Описание нового рецепта.',
+            'cooking_time': 30,
+            'image': get_image_payload(),
+            'tags': [tag.id],
+            'ingredients': [
+                {'id': ingredient_id, 'amount': index + 1}
+                for index, ingredient_id in enumerate(ingredient_ids)
+            ],
+        },
+        'recipe_update': {
+            'name': 'Изменённый рецепт',
+            'ingredients': [
+                {'id': ingredient_id, 'amount': index + 2}
+                for index, ingredient_id in enumerate(ingredient_ids)
+            ],
+        },
+    }
+
+
+def percentile(values, percent):
+    """Returns the nearest-rank percentile of sorted values."""
+    index = max(0, -(-len(values) * percent // 100) - 1)
+    return values[int(index)]
+
+
+class Benchmark:
+    """Runs every endpoint through the test client and collects stats.
+
+    Endpoints are measured with warm caches first and then once more
+    with the cache cleared before every request.
+    """
+
+    def __init__(self, client, context):
+        self.client = client
+        self.context = context
+        token, _ = Token.objects.get_or_create(user=context['user'])
+        context.update(token=token.key, metrics_token=METRICS_TOKEN)
+        self.samples = {endpoint['name']: [] for endpoint in ALL_ENDPOINTS}
+        self.queries = {endpoint['name']: [] for endpoint in ALL_ENDPOINTS}
+        self.cold_samples = {endpoint['name']: [] for endpoint in ALL_ENDPOINTS}
+        self.cold_queries = {endpoint['name']: [] for endpoint in ALL_ENDPOINTS}
+        self.errors = {}
+
+    def get_headers(self, endpoint):
+        """Returns the authorization header of the endpoint credentials."""
+        if endpoint.get('anonymous'):
+            return {}
+        authorization = AUTHORIZATION[endpoint.get('auth', 'user')]
+        return {'HTTP_AUTHORIZATION': authorization.format(**self.context)}
+
+    def request(self, endpoint, cold=False):
+        """Makes one request and returns its duration and query count."""
+        path = endpoint['path'].format(**self.context)
+        data = self.context[endpoint['data']] if 'data' in endpoint else None
+        if callable(data):
+            data = data()
+        headers = self.get_headers(endpoint)
+        method = getattr(self.client, endpoint['method'])
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = method(
+                path, data, content_type='application/json', **headers
+            )
+            if hasattr(response, 'streaming_content'):
+                b''.join(response.streaming_content)
+            duration = time.perf_counter() - started
+        expected = endpoint.get('status', 200)
+        if cold:
+            expected = endpoint.get('cold_status', expected)
+        if response.status_code != expected:
+            error = f'{response.status_code} вместо {expected}'
+            self.errors[endpoint['name']] = (
+                f'{error} с пустым кэшем' if cold else error
+            )
+        elif 'save' in endpoint:
+            self.context[endpoint['save']] = (
+                response.json()[endpoint.get('field', 'id')]
+            )
+        return duration, len(queries)
+
+    def run(self, iterations, warmup):
+        """Runs all endpoints 'warmup' times unmeasured, then measured.
+
+        The measured iterations are repeated with cold caches.
+        """
+        for endpoints in (ENDPOINTS, CATALOGUE_ENDPOINTS):
+            for iteration in range(warmup + iterations):
+                for endpoint in endpoints:
+                    duration, queries = self.request(endpoint)
+                    if iteration >= warmup:
+                        self.samples[endpoint['name']].append(duration)
+                        self.queries[endpoint['name']].append(queries)
+        for iteration in range(iterations):
+            for endpoint in ALL_ENDPOINTS:
+                duration, queries = self.request(endpoint, cold=True)
+                self.cold_samples[endpoint['name']].append(duration)
+                self.cold_queries[endpoint['name']].append(queries)
+
+    def results(self):
+        """Returns latency percentiles and query counts per endpoint."""
+        results = {}
+        for endpoint in ALL_ENDPOINTS:
+            name = endpoint['name']
+            samples = sorted(self.samples[name])
+            cold_samples = sorted(self.cold_samples[name])
+            results[name] = {
+                'method': endpoint['method'].upper(),
+                'path': endpoint['path'],
+                'p50_ms': round(percentile(samples, 50) * 1000, 3),
+                'p90_ms': round(percentile(samples, 90) * 1000, 3),
+                'p99_ms': round(percentile(samples, 99) * 1000, 3),
+                'max_ms': round(samples[-1] * 1000, 3),
+                'queries': max(self.queries[name]),
+                'budget': endpoint['budget'],
+                'cold_p50_ms': round(percentile(cold_samples, 50) * 1000, 3),
+                'cold_queries': max(self.cold_queries[name]),
+                'cold_budget': endpoint.get('cold_budget', endpoint['budget']),
+                'error': self.errors.get(name),
+            }
+        return results
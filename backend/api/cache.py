@@ -0,0 +1,54 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_KEY = 'version:{}'
+MODIFIED_KEY = 'modified:{}'
+PROCESS_CACHE_BACKENDS = (
+    'django.core.cache.backends.dummy.DummyCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+
+def is_cache_shared():
+    """Checks if the default cache is shared by every worker process.
+
+    Entries of a process cache are evicted only in the process that
+    handled the write, so data that must not outlive a change is kept
+    there briefly or not at all.
+    """
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_CACHE_BACKENDS
+
+
+def get_version(name):
+    """Returns current version number of a cached data set.
+
+    A lost version starts from the current time in milliseconds,
+    so entries built for earlier versions are never reused.
+    """
+    version = cache.get(VERSION_KEY.format(name))
+    if version is None:
+        cache.add(VERSION_KEY.format(name), int(time.time() * 1000), None)
+        version = cache.get(VERSION_KEY.format(name))
+    return version
+
+
+def get_last_modified(name):
+    """Returns timestamp of the last change of a cached data set."""
+    modified = cache.get(MODIFIED_KEY.format(name))
+    if modified is None:
+        modified = int(time.time())
+        cache.add(MODIFIED_KEY.format(name), modified, None)
+    return modified
+
+
+def bump_version(name):
+    """Invalidates every cache entry built for a data set."""
+    cache.set(MODIFIED_KEY.format(name), int(time.time()), None)
+    try:
+        return cache.incr(VERSION_KEY.format(name))
+    except ValueError:
+        version = int(time.time() * 1000)
+        cache.set(VERSION_KEY.format(name), version, None)
+        return version
@@ -1,10 +1,16 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Count
 from django_filters.rest_framework import FilterSet, filters
 from rest_framework.filters import SearchFilter
 
+from recipes.membership import get_membership
 from recipes.models import Ingredient, Recipe
+from recipes.search import search_recipes
+from recipes.tag_map import get_tag_choices, get_tag_ids
 
 User = get_user_model()
+RecipeTag = Recipe.tags.through
+TAGS_MODES = (('any', 'any'), ('all', 'all'))
 
 
 class IngredientFilter(SearchFilter):
@@ -18,25 +24,68 @@ class IngredientFilter(SearchFilter):
 
 class RecipeFilter(FilterSet):
     """Recipe search filter model."""
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = filters.MultipleChoiceFilter(
+        choices=get_tag_choices, method='filter_tags'
+    )
+    tags_mode = filters.ChoiceFilter(choices=TAGS_MODES, method='skip')
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
     is_favorited = filters.BooleanFilter(method='if_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='if_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='search_by_text')
+    ordering = filters.OrderingFilter(
+        fields=('pub_date', 'favorites_count', 'in_carts_count',)
+    )
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart',)
+        fields = (
+            'tags',
+            'tags_mode',
+            'author',
+            'is_favorited',
+            'is_in_shopping_cart',
+            'search',
+            'ordering',
+        )
+
+    def filter_tags(self, queryset, name, value):
+        """'tags' parameter filter selecting each recipe once.
+
+        Slugs are resolved to ids from the cached tag map and recipes are
+        selected by one subquery on the recipe tags table: having any of
+        the tags or, with 'tags_mode=all', every one of them.
+        """
+        tag_ids = get_tag_ids()
+        ids = {tag_ids[slug] for slug in value}
+        recipes = RecipeTag.objects.filter(tag_id__in=ids)
+        if self.form.cleaned_data.get('tags_mode') == 'all':
+            recipes = recipes.values('recipe_id').annotate(
+                tags_count=Count('tag_id')
+            ).filter(tags_count=len(ids))
+        return queryset.filter(id__in=recipes.values('recipe_id'))
+
+    def skip(self, queryset, name, value):
+        """Method for parameters read by other filters."""
+        return queryset
 
     def if_is_favorited(self, queryset, name, value):
         """'is_favorited' parameter filter processing method."""
         if value and self.request.user.is_authenticated:
-            return queryset.filter(favorites__user=self.request.user)
+            return queryset.filter(
+                id__in=get_membership(self.request.user, 'favorites')
+            )
         return queryset
 
     def if_is_in_shopping_cart(self, queryset, name, value):
         """'if_is_in_shopping_cart' parameter filter processing method."""
         if value and self.request.user.is_authenticated:
-            return queryset.filter(shopping_list__user=self.request.user)
-        return
+            return queryset.filter(
+                id__in=get_membership(self.request.user, 'shopping_list')
+            )
+        return queryset
+
+    def search_by_text(self, queryset, name, value):
+        """'search' parameter processing method ranking by relevance."""
+        return search_recipes(queryset, value)
@@ -0,0 +1,133 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (override_settings, setup_databases,
+                               setup_test_environment, teardown_databases,
+                               teardown_test_environment)
+
+from api.benchmarks import (DATASET, METRICS_TOKEN, Benchmark, get_context,
+                            seed_dataset)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarking every API endpoint on a synthetic dataset '
+        'in a separate test database.'
+    )
+
+    def add_arguments(self, parser):
+        for name, default in DATASET.items():
+            parser.add_argument(
+                f'--{name}', type=int, default=default,
+                help=f'Number of seeded {name}.',
+            )
+        parser.add_argument(
+            '--iterations', type=int, default=20,
+            help='Measured requests per endpoint.',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=2,
+            help='Unmeasured requests per endpoint made first.',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Random seed of the dataset.',
+        )
+        parser.add_argument(
+            '--output', help='File to write JSON results to.',
+        )
+        parser.add_argument(
+            '--compare', help='JSON results of a previous run to compare.',
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('Нужна хотя бы одна итерация.')
+        sizes = {name: options[name] for name in DATASET}
+        self.stdout.write(self.style.WARNING('Command start'))
+        setup_test_environment()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            if connection.vendor == 'sqlite':
+                # Shared in-memory databases lock whole tables, which
+                # breaks writes made by background job callbacks.
+                connection.settings_dict['TEST']['NAME'] = os.path.join(
+                    temp_dir, 'benchmark.sqlite3'
+                )
+            old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                with override_settings(
+                    MEDIA_ROOT=temp_dir, METRICS_TOKEN=METRICS_TOKEN
+                ):
+                    results = self.run_benchmark(sizes, options)
+            finally:
+                teardown_databases(old_config, verbosity=0)
+                teardown_test_environment()
+        report = {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'database': connection.vendor,
+            'dataset': sizes,
+            'iterations': options['iterations'],
+            'endpoints': results,
+        }
+        self.print_results(results, options['compare'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+        failed = [
+            name for name, result in results.items()
+            if self.is_failed(result)
+        ]
+        if failed:
+            raise CommandError(
+                f'Превышен бюджет запросов или ошибка: {", ".join(failed)}'
+            )
+        self.stdout.write(self.style.SUCCESS('Бюджеты запросов соблюдены'))
+
+    def run_benchmark(self, sizes, options):
+        """Seeds the dataset and measures every endpoint."""
+        cache.clear()
+        seed_dataset(sizes, options['seed'])
+        benchmark = Benchmark(Client(), get_context())
+        benchmark.run(options['iterations'], options['warmup'])
+        return benchmark.results()
+
+    @staticmethod
+    def is_failed(result):
+        """Checks if a request failed or exceeded any query budget."""
+        return bool(
+            result['error']
+            or result['queries'] > result['budget']
+            or result['cold_queries'] > result['cold_budget']
+        )
+
+    def print_results(self, results, compare):
+        """Prints a table of results, with p50 change against 'compare'."""
+        previous = {}
+        if compare:
+            with open(compare, encoding='utf-8') as compared:
+                previous = json.load(compared)['endpoints']
+        self.stdout.write(
+            f'{"endpoint":<26}{"p50":>9}{"p90":>9}{"p99":>9}'
+            f'{"queries":>9}{"budget":>8}{"cold p50":>10}{"cold q":>8}'
+            f'{"budget":>8}'
+        )
+        for name, result in results.items():
+            line = (
+                f'{name:<26}{result["p50_ms"]:>9.2f}{result["p90_ms"]:>9.2f}'
+                f'{result["p99_ms"]:>9.2f}{result["queries"]:>9}'
+                f'{result["budget"]:>8}{result["cold_p50_ms"]:>10.2f}'
+                f'{result["cold_queries"]:>8}{result["cold_budget"]:>8}'
+            )
+            if name in previous and previous[name]['p50_ms']:
+                change = result['p50_ms'] / previous[name]['p50_ms'] - 1
+                line += f'{change:>+9.0%}'
+            if result['error']:
+                line += f'  {result["error"]}'
+            style = self.style.ERROR if self.is_failed(result) else str
+            self.stdout.write(style(line))
@@ -0,0 +1,109 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPException
+from itertools import cycle
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Measuring throughput of a running server, for example a WSGI and '
+        'an ASGI deployment with the same number of workers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'urls', nargs='+', help='URLs requested in turn by every client.',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=32,
+            help='Number of simultaneous clients.',
+        )
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='Test duration in seconds.',
+        )
+        parser.add_argument(
+            '--header', action='append', default=[],
+            help='Request header such as "Authorization: Token <key>".',
+        )
+        parser.add_argument(
+            '--output', help='File to write JSON results to.',
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('Нужен хотя бы один клиент.')
+        headers = {}
+        for header in options['header']:
+            name, _, value = header.partition(':')
+            headers[name.strip()] = value.strip()
+        self.stdout.write(self.style.WARNING('Command start'))
+        started = time.monotonic()
+        latencies, errors = self.run_clients(options, headers)
+        elapsed = time.monotonic() - started
+        if not latencies:
+            raise CommandError('Ни один запрос не выполнен успешно.')
+        latencies.sort()
+        results = {
+            'urls': options['urls'],
+            'concurrency': options['concurrency'],
+            'duration': round(elapsed, 3),
+            'requests': len(latencies),
+            'errors': len(errors),
+            'requests_per_second': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+            'p90_ms': round(percentile(latencies, 90) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        }
+        for name, value in results.items():
+            if name != 'urls':
+                self.stdout.write(f'{name}: {value}')
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, indent=2)
+        self.stdout.write(self.style.SUCCESS('Нагрузочный тест завершён'))
+
+    def run_clients(self, options, headers):
+        """Returns latencies of successful and failed requests."""
+        deadline = time.monotonic() + options['duration']
+        lock = threading.Lock()
+        latencies = []
+        errors = []
+
+        def client(number):
+            """Requests URLs in turn until the deadline."""
+            offset = number % len(options['urls'])
+            urls = cycle(options['urls'][offset:] + options['urls'][:offset])
+            connections = {}
+            while time.monotonic() < deadline:
+                url = urlsplit(next(urls))
+                connection = connections.get(url.netloc)
+                if connection is None:
+                    connection = connections[url.netloc] = HTTPConnection(
+                        url.netloc, timeout=30
+                    )
+                path = url.path + (f'?{url.query}' if url.query else '')
+                started = time.perf_counter()
+                try:
+                    connection.request('GET', path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    failed = response.status >= 400
+                except (OSError, HTTPException):
+                    connection.close()
+                    connections.pop(url.netloc)
+                    failed = True
+                duration = time.perf_counter() - started
+                with lock:
+                    (errors if failed else latencies).append(duration)
+
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            list(executor.map(client, range(options['concurrency'])))
+        return latencies, errors
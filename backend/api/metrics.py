@@ -0,0 +1,180 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.utils.deprecation import MiddlewareMixin
+from prometheus_client import (REGISTRY, CollectorRegistry, Histogram,
+                               generate_latest, multiprocess)
+
+MULTIPROCESS_DIR_VARIABLE = 'PROMETHEUS_MULTIPROC_DIR'
+UNRESOLVED_VIEW = 'unresolved'
+LABELS = ('view', 'method')
+
+REQUEST_DURATION = Histogram(
+    'foodgram_request_duration_seconds',
+    'Total request processing time.',
+    LABELS,
+)
+QUERY_DURATION = Histogram(
+    'foodgram_request_query_duration_seconds',
+    'Time spent in SQL queries per request.',
+    LABELS,
+)
+QUERY_COUNT = Histogram(
+    'foodgram_request_queries',
+    'Number of SQL queries per request.',
+    LABELS,
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, float('inf')),
+)
+SERIALIZER_DURATION = Histogram(
+    'foodgram_request_serializer_duration_seconds',
+    'Time spent in serializers representing objects per request.',
+    LABELS,
+)
+RESPONSE_SIZE = Histogram(
+    'foodgram_response_size_bytes',
+    'Response body size.',
+    LABELS,
+    buckets=tuple(4 ** power for power in range(4, 12)) + (float('inf'),),
+)
+
+current_timings = ContextVar('current_timings', default=None)
+
+
+class RequestTimings:
+    """Query and serializer timings collected while serving a request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_duration = 0.0
+        self.serializer_duration = 0.0
+        self.serializer_depth = 0
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper adding queries to request timings.
+
+    Timings are found through a context variable, so queries made in
+    threads serving async views are counted as well.
+    """
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.query_duration += time.perf_counter() - started
+        timings.queries += 1
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """Adds the query recorder to a new database connection once."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def serializer_timing():
+    """Adds time spent in the block to request serializer timings.
+
+    Only outermost blocks are measured, so nested serializers are not
+    counted twice.
+    """
+    timings = current_timings.get()
+    if timings is None or timings.serializer_depth:
+        yield
+        return
+    timings.serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.serializer_duration += time.perf_counter() - started
+        timings.serializer_depth -= 1
+
+
+class TimedSerializerMixin:
+    """Serializer mixin adding representation time to request timings."""
+
+    def to_representation(self, instance):
+        with serializer_timing():
+            return super().to_representation(instance)
+
+
+def get_response_size(response):
+    """Returns body size or Content-Length of a streaming response."""
+    if response.streaming:
+        return int(response.get('Content-Length', 0))
+    return len(response.content)
+
+
+def get_server_timing(total, timings):
+    """Formats durations as a Server-Timing header value."""
+    return ', '.join((
+        f'total;dur={total * 1000:.1f}',
+        f'db;desc="{timings.queries} queries";'
+        f'dur={timings.query_duration * 1000:.1f}',
+        f'serializer;dur={timings.serializer_duration * 1000:.1f}',
+    ))
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    """Measures requests, adds Server-Timing header and records metrics.
+
+    Works in both WSGI and ASGI modes. Histograms are labelled by the
+    resolved view name, so their number does not grow with distinct URLs.
+    """
+
+    def process_request(self, request):
+        timings = RequestTimings()
+        request.metrics_timings = timings, current_timings.set(timings)
+
+    def process_response(self, request, response):
+        timings, token = request.metrics_timings
+        current_timings.reset(token)
+        return self.record(request, response, timings)
+
+    async def __acall__(self, request):
+        """Runs the hooks on the event loop, since they never block."""
+        self.process_request(request)
+        response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    @staticmethod
+    def record(request, response, timings):
+        """Adds Server-Timing header and observes request histograms."""
+        total = time.perf_counter() - timings.started
+        response['Server-Timing'] = get_server_timing(total, timings)
+        match = request.resolver_match
+        labels = (
+            match.view_name if match else UNRESOLVED_VIEW, request.method
+        )
+        REQUEST_DURATION.labels(*labels).observe(total)
+        QUERY_DURATION.labels(*labels).observe(timings.query_duration)
+        QUERY_COUNT.labels(*labels).observe(timings.queries)
+        SERIALIZER_DURATION.labels(*labels).observe(
+            timings.serializer_duration
+        )
+        RESPONSE_SIZE.labels(*labels).observe(get_response_size(response))
+        return response
+
+
+def get_registry():
+    """Returns registry aggregating every worker in multiprocess mode.
+
+    Multiprocess mode is enabled by PROMETHEUS_MULTIPROC_DIR variable
+    pointing to a directory shared by gunicorn workers.
+    """
+    if MULTIPROCESS_DIR_VARIABLE not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics():
+    """Returns metrics in Prometheus text format."""
+    return generate_latest(get_registry())
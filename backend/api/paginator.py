@@ -1,7 +1,290 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import hashlib
+import json
+from functools import partial, reduce
+from operator import and_, or_
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import (EmptyPage, Page, PageNotAnInteger,
+                                   Paginator)
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from api.cache import get_version
+from foodgram.db_router import primary_reads
+
+RECIPES_COUNT_VERSION = 'recipe_counts'
+USERS_COUNT_VERSION = 'user_counts'
+SUBSCRIPTIONS_COUNT_VERSION = 'subscription_counts'
+COUNT_KEY = 'count:{}:{}'
+
+
+def get_estimated_count(queryset):
+    """Returns PostgreSQL planner row estimate for unfiltered querysets.
+
+    None is returned when the estimate is not available or the table
+    is smaller than PAGINATION_ESTIMATE_THRESHOLD.
+    """
+    connection = connections[queryset.db]
+    if (connection.vendor != 'postgresql' or queryset.query.where
+            or queryset.query.distinct):
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < settings.PAGINATION_ESTIMATE_THRESHOLD:
+        return None
+    return int(row[0])
+
+
+def get_cached_count(queryset, version_name):
+    """Returns the number of objects cached by the compiled query.
+
+    Keys hash the SQL and parameters of the queryset, so any filter
+    combination is cached separately, and include the version of the
+    list, bumped only by writes changing its totals. Queries that can
+    match nothing, such as filters by an empty set of ids, count zero.
+    """
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    digest = hashlib.sha256(repr((sql, params)).encode('utf-8')).hexdigest()
+    key = COUNT_KEY.format(get_version(version_name), digest)
+    count = cache.get(key)
+    if count is None:
+        with primary_reads():
+            count = get_estimated_count(queryset)
+            if count is None:
+                count = queryset.count()
+        cache.set(key, count, settings.PAGINATION_COUNT_TIMEOUT)
+    return count
+
+
+class CachedCountPaginator(Paginator):
+    """Django paginator taking the total from the count cache."""
+
+    def __init__(self, *args, count_version, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_version = count_version
+
+    @cached_property
+    def count(self):
+        """Returns cached or estimated total number of objects."""
+        return get_cached_count(self.object_list, self.count_version)
+
+    def page(self, number):
+        """Returns a page without clamping it to an estimated total."""
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(
+            self.object_list[bottom:bottom + self.per_page], number, self
+        )
+
+
+class UncountedPage(Page):
+    """Page that knows if there is a next one without the total."""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class UncountedPaginator(Paginator):
+    """Django paginator that never counts objects.
+
+    One extra object is fetched to find out if a next page exists.
+    """
+    count = None
+    num_pages = 0
+
+    def validate_number(self, number):
+        """Validates page number without an upper bound."""
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы должен быть целым.')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше единицы.')
+        return number
+
+    def page(self, number):
+        """Returns a page fetching one object more than needed."""
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        objects = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not objects and number > 1:
+            raise EmptyPage('Страница не содержит результатов.')
+        return UncountedPage(
+            objects[:self.per_page], number, self,
+            len(objects) > self.per_page
+        )
+
+
+class KeysetPaginator(BasePagination):
+    """Cursor paginator filtering by the last seen ordering key.
+
+    Pages are selected with a WHERE condition on 'ordering' fields instead
+    of OFFSET, and no total count is calculated, so deep pages cost the same
+    as the first one and concurrent inserts do not shift them.
+    """
+    page_size = 6
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+
+    def get_page_size(self, request):
+        """Returns requested page size limited by 'max_page_size'."""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def encode_cursor(self, instance):
+        """Encodes ordering key of the instance into an opaque cursor."""
+        position = [
+            str(getattr(instance, field.lstrip('-')))
+            for field in self.ordering
+        ]
+        return base64.urlsafe_b64encode(
+            json.dumps(position).encode('utf-8')
+        ).decode('ascii')
+
+    def decode_cursor(self, model, cursor):
+        """Decodes a cursor into the list of ordering field values."""
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor))
+            if len(position) != len(self.ordering):
+                raise ValueError
+            return [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_position_filter(self, position):
+        """Builds condition selecting rows following the position."""
+        conditions = []
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            conditions.append(reduce(and_, [
+                Q(**{other.lstrip('-'): value})
+                for other, value in zip(self.ordering[:index], position)
+            ], Q(**{f'{name}__{lookup}': position[index]})))
+        return reduce(or_, conditions)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Returns the page following the requested cursor."""
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            position = self.decode_cursor(queryset.model, cursor)
+            queryset = queryset.filter(self.get_position_filter(position))
+        page = list(queryset[:page_size + 1])
+        self.next_cursor = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_cursor = self.encode_cursor(page[-1])
+        return page
+
+    def get_next_link(self):
+        """Returns link to the following page or None."""
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param, self.next_cursor
+        )
+
+    def get_paginated_response(self, data):
+        """Returns page without total count."""
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
 
 
 class CustomPaginator(PageNumberPagination):
-    """Creating a paginator that inherits from PageNumberPagination."""
+    """Creating a paginator that inherits from PageNumberPagination.
+
+    Totals are cached per query under the version named by
+    'count_version', 'count=false' parameter leaves them out.
+    Subclasses defining 'cursor_ordering' switch to keyset pagination
+    when 'cursor' parameter is present in the request, an empty value
+    requesting the first page.
+    """
     page_size = 6
     page_size_query_param = 'limit'
+    count_query_param = 'count'
+    count_version = None
+    cursor_ordering = None
+    keyset_paginator = None
+
+    def get_count_version(self, view):
+        """Returns name of the version of cached totals."""
+        return self.count_version
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Chooses page number or keyset pagination."""
+        if (self.cursor_ordering is not None
+                and KeysetPaginator.cursor_query_param in request.query_params):
+            self.keyset_paginator = KeysetPaginator(self.cursor_ordering)
+            return self.keyset_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        count = request.query_params.get(self.count_query_param, '')
+        if count.lower() in ('false', '0'):
+            self.django_paginator_class = UncountedPaginator
+        else:
+            self.django_paginator_class = partial(
+                CachedCountPaginator,
+                count_version=self.get_count_version(view),
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        """Returns response of the chosen pagination mode."""
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class RecipePaginator(CustomPaginator):
+    """Recipe paginator, keyset mode follows Recipe.Meta.ordering."""
+    count_version = RECIPES_COUNT_VERSION
+    cursor_ordering = ('-pub_date', '-id')
+
+
+class UserPaginator(CustomPaginator):
+    """User paginator, keyset mode follows User.Meta.ordering."""
+    count_version = USERS_COUNT_VERSION
+    cursor_ordering = ('username', 'id')
+
+    def get_count_version(self, view):
+        """Subscriptions change with follows rather than users."""
+        if getattr(view, 'action', None) == 'subscriptions':
+            return SUBSCRIPTIONS_COUNT_VERSION
+        return self.count_version
@@ -1,15 +1,27 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Manager, Prefetch, prefetch_related_objects
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers, status
 from rest_framework.exceptions import ValidationError
-from rest_framework.fields import SerializerMethodField
-
+from rest_framework.fields import SerializerMethodField, SkipField
+
+from api.metrics import TimedSerializerMixin, serializer_timing
+from foodgram.db_router import primary_reads, reads_from_replica
+from recipes.fragments import (evict_fragments, get_fragments,
+                               set_fragments)
+from recipes.images import get_variant_urls
+from recipes.list_cache import invalidate_lists
 from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
                             ShoppingCart, Tag)
 from users.models import Follow, User
 
 
-class UserSerializer(UserSerializer):
+class UserSerializer(TimedSerializerMixin, UserSerializer):
     """User serializer."""
     is_subscribed = serializers.BooleanField(default=False)
 
@@ -41,7 +53,6 @@ class CreateUserSerializer(UserCreateSerializer):
 class ShowSubscriptionsSerializer(UserSerializer):
     """Sirializer that displays list of user's subscriptions."""
     recipes = SerializerMethodField()
-    recipes_count = SerializerMethodField()
 
     class Meta:
         model = User
@@ -54,6 +65,7 @@ class ShowSubscriptionsSerializer(UserSerializer):
             'is_subscribed',
             'recipes',
             'recipes_count',
+            'followers_count',
         )
         read_only_fields = ('email', 'username', 'first_name', 'last_name',)
 
@@ -74,23 +86,23 @@ class ShowSubscriptionsSerializer(UserSerializer):
             )
         return data
 
-    def get_recipes_count(self, obj):
-        """Method for counting the number of users's recipes."""
-        return obj.recipes.count()
-
     def get_recipes(self, obj):
         """Method for obtaining user's recipe data
            depending on 'recipes_limit' parameter."""
-        request = self.context.get('request')
-        recipes_limit = request.GET.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if recipes_limit:
-            recipes = recipes[:int(recipes_limit)]
-        serializer = DemoRecipeSerializer(recipes, many=True, read_only=True)
+        if hasattr(obj, 'page_recipes'):
+            recipes = obj.page_recipes
+        else:
+            recipes = obj.recipes.all()
+            recipes_limit = self.context.get('recipes_limit')
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
+        serializer = DemoRecipeSerializer(
+            recipes, many=True, read_only=True, context=self.context
+        )
         return serializer.data
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Tags serializer."""
 
     class Meta:
@@ -98,7 +110,7 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'color', 'slug',)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Ingredients serializer."""
 
     class Meta:
@@ -121,19 +133,36 @@ class IngredientRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount',)
 
 
+class RecipeListSerializer(serializers.ListSerializer):
+    """List serializer representing recipes with one fragment lookup."""
+
+    def to_representation(self, data):
+        """Serializer result presentation method."""
+        recipes = data.all() if isinstance(data, Manager) else data
+        with serializer_timing():
+            return self.child.represent_many(list(recipes))
+
+
 class ShowRecipeSerializer(serializers.ModelSerializer):
-    """Recipe reading serializer."""
+    """Recipe reading serializer.
+
+    Fields that are the same for every user are cached per recipe in
+    fragments, only recipes missing in the cache load their relations
+    and are serialized. Other fields are represented on each request.
+    """
     tags = TagSerializer(read_only=False, many=True)
     author = UserSerializer(read_only=True, many=False)
     ingredients = IngredientRecipeSerializer(
         many=True, source='ingredient_amount'
     )
-    is_favorited = serializers.BooleanField(default=False)
-    is_in_shopping_cart = serializers.BooleanField(default=False)
+    is_favorited = SerializerMethodField()
+    is_in_shopping_cart = SerializerMethodField()
     image = Base64ImageField()
+    image_variants = SerializerMethodField()
 
     class Meta:
         model = Recipe
+        list_serializer_class = RecipeListSerializer
         fields = (
             'id',
             'tags',
@@ -143,20 +172,172 @@ class ShowRecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
+            'favorites_count',
+            'in_carts_count',
         )
+        fragment_fields = (
+            'tags', 'author', 'ingredients', 'name', 'text', 'cooking_time',
+        )
+
+    def to_representation(self, instance):
+        """Serializer result presentation method."""
+        with serializer_timing():
+            return self.represent_many([instance])[0]
+
+    def represent_fields(self, instance, names):
+        """Method represents the named fields of a recipe."""
+        fields = self.fields
+        return {
+            name: fields[name].to_representation(
+                fields[name].get_attribute(instance)
+            )
+            for name in names
+        }
+
+    def get_fragments(self, recipes):
+        """Method returns cached fragments, serializing missing ones.
+
+        Missing fragments are built from the primary. Recipes read from
+        the replica are loaded again, so stale names are not cached.
+        """
+        fragments = get_fragments(recipe.id for recipe in recipes)
+        missing = [recipe for recipe in recipes if recipe.id not in fragments]
+        if missing:
+            stale = reads_from_replica()
+            with primary_reads():
+                if stale:
+                    fresh = Recipe.objects.in_bulk(
+                        [recipe.id for recipe in missing]
+                    )
+                    missing = [
+                        fresh.get(recipe.id, recipe) for recipe in missing
+                    ]
+                prefetch_related_objects(
+                    missing,
+                    'author',
+                    Prefetch(
+                        'ingredient_amount',
+                        queryset=IngredientRecipe.objects.select_related(
+                            'ingredient'
+                        )
+                    ),
+                    'tags',
+                )
+            serialized = {
+                recipe.id: self.represent_fields(
+                    recipe, self.Meta.fragment_fields
+                )
+                for recipe in missing
+            }
+            set_fragments(serialized)
+            fragments.update(serialized)
+        return fragments
+
+    def represent_many(self, recipes):
+        """Method represents recipes adding per-user fields to fragments."""
+        fragments = self.get_fragments(recipes)
+        following = self.context.get('following', ())
+        request_fields = [
+            name for name in self.Meta.fields
+            if name not in self.Meta.fragment_fields
+        ]
+        representation = []
+        for recipe in recipes:
+            data = self.represent_fields(recipe, request_fields)
+            data.update(fragments[recipe.id])
+            data['author'] = dict(
+                data['author'], is_subscribed=recipe.author_id in following
+            )
+            representation.append(
+                {name: data[name] for name in self.Meta.fields}
+            )
+        return representation
 
+    def get_image_variants(self, obj):
+        """Method returns resized image URLs by size and format."""
+        return get_variant_urls(obj, self.context.get('request'))
 
-class CreateRecipeSerializer(serializers.ModelSerializer):
-    """Recipe creation serializer."""
-    ingredients = IngredientRecipeSerializer(
-        many=True
+    def get_is_favorited(self, obj):
+        """Method checks the recipe in user's cached favorites."""
+        return obj.id in self.context.get('favorites', ())
+
+    def get_is_in_shopping_cart(self, obj):
+        """Method checks the recipe in user's cached shopping cart."""
+        return obj.id in self.context.get('shopping_list', ())
+
+
+class IngredientAmountSerializer(serializers.Serializer):
+    """Serializer of an ingredient id and amount in recipe writes."""
+    id = serializers.IntegerField(min_value=1)
+    amount = serializers.IntegerField(
+        min_value=1,
+        max_value=32767,
+        error_messages={'min_value': 'Слишком мало ингредиентов.'}
     )
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True, queryset=Tag.objects.all()
+
+
+def find_id_errors(ids, existing):
+    """Returns messages about repeated ids and ids missing in 'existing'."""
+    errors = []
+    seen = set()
+    duplicates = []
+    for value in ids:
+        if value in seen and value not in duplicates:
+            duplicates.append(value)
+        seen.add(value)
+    if duplicates:
+        errors.append(f'Повторяющиеся id: {duplicates}')
+    missing = [value for value in dict.fromkeys(ids) if value not in existing]
+    if missing:
+        errors.append(f'Не найдены id: {missing}')
+    return errors
+
+
+class RecipeImageField(Base64ImageField):
+    """Base64 image field keeping the stored image when it is sent back.
+
+    The image is skipped if the payload is its URL or the same bytes,
+    so it is neither decoded nor saved again.
+    """
+
+    def is_stored_image(self, data):
+        """Method checks if data repeats the image of the instance."""
+        instance = self.parent.instance
+        if instance is None or not instance.image or not isinstance(data, str):
+            return False
+        image = instance.image
+        request = self.context.get('request')
+        urls = {image.url}
+        if request is not None:
+            urls.add(request.build_absolute_uri(image.url))
+        if data in urls:
+            return True
+        try:
+            content = base64.b64decode(data.split(';base64,')[-1])
+            if len(content) != image.size:
+                return False
+            with image.storage.open(image.name) as stored:
+                return stored.read() == content
+        except (binascii.Error, ValueError, OSError):
+            return False
+
+    def to_internal_value(self, data):
+        """Method skips the field if the image has not changed."""
+        if self.is_stored_image(data):
+            raise SkipField()
+        return super().to_internal_value(data)
+
+
+class CreateRecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Recipe creation serializer."""
+    ingredients = IngredientAmountSerializer(many=True, allow_empty=False)
+    tags = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False
     )
-    image = Base64ImageField()
+    image = RecipeImageField()
     author = UserSerializer(read_only=True)
 
     class Meta:
@@ -172,19 +353,49 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             'cooking_time',
         )
 
+    def validate(self, data):
+        """Method checks all ingredient and tag ids with one query each.
+
+        Every missing or repeated id is reported in a single response.
+        """
+        errors = {}
+        ingredient_ids = [
+            ingredient_data['id']
+            for ingredient_data in data.get('ingredients', ())
+        ]
+        if ingredient_ids:
+            existing = set(Ingredient.objects.filter(
+                id__in=ingredient_ids
+            ).values_list('id', flat=True))
+            ingredient_errors = find_id_errors(ingredient_ids, existing)
+            if ingredient_errors:
+                errors['ingredients'] = ingredient_errors
+        tag_ids = data.get('tags', ())
+        if tag_ids:
+            existing = set(
+                Tag.objects.filter(id__in=tag_ids).values_list('id', flat=True)
+            )
+            tag_errors = find_id_errors(tag_ids, existing)
+            if tag_errors:
+                errors['tags'] = tag_errors
+        if errors:
+            raise serializers.ValidationError(errors)
+        return data
+
     @staticmethod
     def create_ingredients(recipe, ingredients):
         ingredient_list = []
         for ingredient_data in ingredients:
             ingredient_list.append(
                 IngredientRecipe(
-                    ingredient=ingredient_data.pop('id'),
-                    amount=ingredient_data.pop('amount'),
+                    ingredient_id=ingredient_data['id'],
+                    amount=ingredient_data['amount'],
                     recipe=recipe,
                 )
             )
         IngredientRecipe.objects.bulk_create(ingredient_list)
 
+    @transaction.atomic
     def create(self, validated_data):
         request = self.context.get('request', None)
         tags = validated_data.pop('tags')
@@ -194,29 +405,108 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         self.create_ingredients(recipe, ingredients)
         return recipe
 
+    @staticmethod
+    def update_tags(recipe, tags):
+        """Adds and removes only tags that differ from stored ones."""
+        current = {tag.id for tag in recipe.tags.all()}
+        incoming = set(tags)
+        if current - incoming:
+            recipe.tags.remove(*(current - incoming))
+        if incoming - current:
+            recipe.tags.add(*(incoming - current))
+
+    @staticmethod
+    def update_ingredients(recipe, ingredients):
+        """Inserts, updates and deletes only changed ingredient amounts."""
+        current = {
+            amount.ingredient_id: amount
+            for amount in recipe.ingredient_amount.all()
+        }
+        incoming = {
+            ingredient_data['id']: ingredient_data['amount']
+            for ingredient_data in ingredients
+        }
+        removed = [
+            amount.id for ingredient_id, amount in current.items()
+            if ingredient_id not in incoming
+        ]
+        if removed:
+            IngredientRecipe.objects.filter(id__in=removed).delete()
+        changed = []
+        for ingredient_id, value in incoming.items():
+            amount = current.get(ingredient_id)
+            if amount is not None and amount.amount != value:
+                amount.amount = value
+                changed.append(amount)
+        if changed:
+            IngredientRecipe.objects.bulk_update(changed, ['amount'])
+        added = IngredientRecipe.objects.bulk_create([
+            IngredientRecipe(
+                recipe=recipe, ingredient_id=ingredient_id, amount=value
+            )
+            for ingredient_id, value in incoming.items()
+            if ingredient_id not in current
+        ])
+        if removed or changed or added:
+            # Bulk queries send no signals to invalidate cached recipes.
+            getattr(recipe, '_prefetched_objects_cache', {}).pop(
+                'ingredient_amount', None
+            )
+            evict_fragments((recipe.pk,))
+            invalidate_lists()
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.tags.clear()
-        IngredientRecipe.objects.filter(recipe=instance).delete()
-        instance.tags.set(validated_data.pop('tags'))
-        ingredients = validated_data.pop('ingredients')
-        self.create_ingredients(instance, ingredients)
-        return super().update(instance, validated_data)
+        """Method writes only fields and relations that have changed."""
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+        if tags is not None:
+            self.update_tags(instance, tags)
+        if ingredients is not None:
+            self.update_ingredients(instance, ingredients)
+        changed = [
+            field for field, value in validated_data.items()
+            if getattr(instance, field) != value
+        ]
+        for field in changed:
+            setattr(instance, field, validated_data[field])
+        if changed:
+            instance.save(update_fields=changed)
+        return instance
 
     def to_representation(self, instance):
-        """Serializer result presentation method."""
-        return ShowRecipeSerializer(instance, context={
-            'request': self.context.get('request')
-        }).data
+        """Serializer result presentation method.
+
+        Relations of a written recipe are loaded with one query each.
+        """
+        if not getattr(instance, '_prefetched_objects_cache', None):
+            prefetch_related_objects(
+                [instance],
+                Prefetch(
+                    'ingredient_amount',
+                    queryset=IngredientRecipe.objects.select_related(
+                        'ingredient'
+                    )
+                ),
+                'tags',
+            )
+        return ShowRecipeSerializer(instance, context=self.context).data
 
 
-class DemoRecipeSerializer(serializers.ModelSerializer):
+class DemoRecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for simplified display of the recipe model."""
+    image_variants = SerializerMethodField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time',)
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time',)
+
+    def get_image_variants(self, obj):
+        """Method returns resized image URLs by size and format."""
+        return get_variant_urls(obj, self.context.get('request'))
 
 
-class FavoritesCartBasicSerializer(serializers.ModelSerializer):
+class FavoritesCartBasicSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Basic serializer for favorites and shopping cart."""
     def to_representation(self, instance):
         """Serializer result presentation method."""
@@ -239,6 +529,16 @@ class FavoritesCartBasicSerializer(serializers.ModelSerializer):
             })
         return data
 
+    def create(self, validated_data):
+        """Method creates the object, a concurrent duplicate is rejected."""
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError({
+                'status': ['Уже существует!']
+            })
+
 
 class FavoriteSerializer(FavoritesCartBasicSerializer):
     """Favorite recipes serializer."""
@@ -256,3 +556,25 @@ class ShoppingCartSerializer(FavoritesCartBasicSerializer):
     class Meta:
         model = ShoppingCart
         fields = ('user', 'recipe',)
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Serializer of recipe ids for bulk favorites and cart changes."""
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_RECIPES_LIMIT,
+    )
+
+    def validate_recipes(self, value):
+        """Method validates that every recipe exists with one query."""
+        value = list(dict.fromkeys(value))
+        found = set(
+            Recipe.objects.filter(id__in=value).values_list('id', flat=True)
+        )
+        missing = [recipe_id for recipe_id in value if recipe_id not in found]
+        if missing:
+            raise serializers.ValidationError(
+                f'Рецепты не найдены: {missing}'
+            )
+        return value
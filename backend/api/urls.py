@@ -1,6 +1,10 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from api.views import metrics
+from recipes.async_views import (ingredient_list, recipe_detail, recipe_list,
+                                 tag_list)
 from recipes.views import (FavoriteViewSet, IngredientViewSet, RecipeViewSet,
                            ShoppingCartViewSet, TagViewSet)
 from users.views import UserViewSet
@@ -15,9 +19,16 @@ router_v1.register('users', UserViewSet, basename='users')
 
 
 urlpatterns = [
+    path('recipes/favorite/', FavoriteViewSet.as_view(
+        {'post': 'bulk_add', 'delete': 'bulk_remove'}
+    )),
+    path('recipes/shopping_cart/', ShoppingCartViewSet.as_view(
+        {'post': 'bulk_add', 'delete': 'bulk_remove'}
+    )),
     path('', include(router_v1.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
+    path('metrics/', metrics, name='metrics'),
     path('recipes/<int:id>/favorite/', FavoriteViewSet.as_view(
         {'post': 'create', 'delete': 'delete'}
     )),
@@ -25,3 +36,11 @@ urlpatterns = [
         {'post': 'create', 'delete': 'delete'}
     )),
 ]
+
+if settings.ASYNC_VIEWS:
+    urlpatterns = [
+        path('tags/', tag_list, name='tags-list'),
+        path('ingredients/', ingredient_list, name='ingredients-list'),
+        path('recipes/', recipe_list, name='recipes-list'),
+        path('recipes/<int:pk>/', recipe_detail, name='recipes-detail'),
+    ] + urlpatterns
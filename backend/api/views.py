@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from api.metrics import render_metrics
+
+
+def metrics(request):
+    """Prometheus metrics of requests served by the application.
+
+    Metrics are shown to staff users and to clients sending METRICS_TOKEN
+    as a bearer token, so without the token only staff can read them.
+    """
+    has_token = settings.METRICS_TOKEN and constant_time_compare(
+        request.headers.get('Authorization', ''),
+        f'Bearer {settings.METRICS_TOKEN}'
+    )
+    if not (has_token or request.user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
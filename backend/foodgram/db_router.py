@@ -0,0 +1,176 @@
+import hashlib
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, close_old_connections, connections
+from django.utils.deprecation import MiddlewareMixin
+
+PRIMARY = 'default'
+REPLICA = 'replica'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+STICKY_KEY = 'replica:sticky:{}'
+# Tokens are read on the primary, so a token issued a moment ago is
+# found before it reaches the replica.
+PRIMARY_APPS = ('authtoken',)
+
+read_database = ContextVar('read_database', default=PRIMARY)
+_replica_lag = {'checked': 0.0, 'lag': 0.0}
+
+
+def replica_configured():
+    """Checks if the replica database alias is defined."""
+    return REPLICA in settings.DATABASES
+
+
+def reads_from_replica():
+    """Checks if reads of the current context are served by the replica."""
+    return replica_configured() and read_database.get() != PRIMARY
+
+
+@contextmanager
+def primary_reads():
+    """Routes reads of the block to the primary.
+
+    Caches and in-memory indexes shared by every request are filled
+    inside it, so rows of a lagging replica are never stored under
+    a version bumped by a newer write.
+    """
+    token = read_database.set(PRIMARY)
+    try:
+        yield
+    finally:
+        read_database.reset(token)
+
+
+def database_sync_to_async(func):
+    """Runs a function using the database in a thread of the pool.
+
+    Calls do not wait for the single thread shared by thread sensitive
+    code. Django closes connections only in that thread at the end of
+    requests, so connections of pool threads are closed around calls.
+    """
+    @wraps(func)
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)
+
+
+def get_replica_lag():
+    """Returns replication lag of the replica in seconds.
+
+    The lag is queried at most once per REPLICA_LAG_CHECK_INTERVAL in
+    each process. Databases that are not PostgreSQL standbys report
+    no lag, an unreachable replica reports an infinite one.
+    """
+    now = time.monotonic()
+    if now - _replica_lag['checked'] < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return _replica_lag['lag']
+    connection = connections[REPLICA]
+    lag = 0.0
+    try:
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT CASE WHEN pg_last_wal_receive_lsn() '
+                    '= pg_last_wal_replay_lsn() THEN 0 ELSE EXTRACT('
+                    'EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+                )
+                lag = float(cursor.fetchone()[0] or 0)
+    except DatabaseError:
+        lag = float('inf')
+    _replica_lag.update(checked=now, lag=lag)
+    return lag
+
+
+def get_client_key(request):
+    """Returns cache key identifying the client by its credentials."""
+    credentials = request.headers.get('Authorization') or request.COOKIES.get(
+        settings.SESSION_COOKIE_NAME
+    )
+    if not credentials:
+        return None
+    digest = hashlib.sha256(credentials.encode('utf-8')).hexdigest()
+    return STICKY_KEY.format(digest)
+
+
+def choose_read_database(request, client_key):
+    """Returns the alias that should serve reads of the request."""
+    if (request.method in SAFE_METHODS
+            and not (client_key and cache.get(client_key))
+            and get_replica_lag() <= settings.REPLICA_MAX_LAG):
+        return REPLICA
+    return PRIMARY
+
+
+def stick_to_primary(request, client_key):
+    """Pins a client that has written to the primary for a while."""
+    if request.method not in SAFE_METHODS and client_key:
+        cache.set(client_key, True, settings.REPLICA_STICKY_SECONDS)
+
+
+class ReplicaMiddleware(MiddlewareMixin):
+    """Chooses the database that serves reads of a request.
+
+    Safe requests read from the replica unless its lag exceeds
+    REPLICA_MAX_LAG or the client has written within the last
+    REPLICA_STICKY_SECONDS, so clients always see their own changes.
+    Other requests and code running outside requests use the primary.
+    """
+
+    def process_request(self, request):
+        if not replica_configured():
+            return
+        client_key = get_client_key(request)
+        token = read_database.set(choose_read_database(request, client_key))
+        request.replica_state = client_key, token
+
+    def process_response(self, request, response):
+        if hasattr(request, 'replica_state'):
+            client_key, token = request.replica_state
+            read_database.reset(token)
+            stick_to_primary(request, client_key)
+        return response
+
+    async def __acall__(self, request):
+        """Sets the read database on the loop, checks run in the pool."""
+        if not replica_configured():
+            return await self.get_response(request)
+        client_key = get_client_key(request)
+        token = read_database.set(
+            await database_sync_to_async(choose_read_database)(
+                request, client_key
+            )
+        )
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_database.reset(token)
+        await sync_to_async(stick_to_primary, thread_sensitive=False)(
+            request, client_key
+        )
+        return response
+
+
+class ReplicaRouter:
+    """Routes writes to the primary and reads as ReplicaMiddleware chose."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_APPS or not replica_configured():
+            return PRIMARY
+        return read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
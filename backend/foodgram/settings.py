@@ -18,6 +18,7 @@ INSTALLED_APPS = [
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
+    "django.contrib.postgres",
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
@@ -35,6 +36,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'foodgram.db_router.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -64,6 +67,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
+ASGI_APPLICATION = 'foodgram.asgi.application'
+
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', default='False') == 'True'
+
 if DEBUG:
     DATABASES = {
         'default': {
@@ -83,6 +90,115 @@ else:
         }
     }
 
+if os.getenv('DB_REPLICA_NAME') or os.getenv('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv(
+            'DB_REPLICA_NAME', default=DATABASES['default']['NAME']
+        ),
+        'HOST': os.getenv(
+            'DB_REPLICA_HOST', default=DATABASES['default'].get('HOST', '')
+        ),
+        'PORT': os.getenv(
+            'DB_REPLICA_PORT', default=DATABASES['default'].get('PORT', '')
+        ),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['foodgram.db_router.ReplicaRouter']
+
+REPLICA_STICKY_SECONDS = int(
+    os.getenv('REPLICA_STICKY_SECONDS', default=5)
+)
+
+REPLICA_MAX_LAG = float(
+    os.getenv('REPLICA_MAX_LAG', default=2)
+)
+
+REPLICA_LAG_CHECK_INTERVAL = float(
+    os.getenv('REPLICA_LAG_CHECK_INTERVAL', default=5)
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='foodgram'),
+    }
+}
+
+SHOPPING_LIST_CACHE_TIMEOUT = int(
+    os.getenv('SHOPPING_LIST_CACHE_TIMEOUT', default=60 * 60 * 24)
+)
+
+SHOPPING_LIST_JOB_TIMEOUT = int(
+    os.getenv('SHOPPING_LIST_JOB_TIMEOUT', default=60)
+)
+
+BACKGROUND_WORKERS = int(
+    os.getenv('BACKGROUND_WORKERS', default=2)
+)
+
+INGREDIENT_SEARCH_LIMIT = int(
+    os.getenv('INGREDIENT_SEARCH_LIMIT', default=50)
+)
+
+RECIPE_SEARCH_LIMIT = int(
+    os.getenv('RECIPE_SEARCH_LIMIT', default=200)
+)
+
+PAGINATION_COUNT_TIMEOUT = int(
+    os.getenv('PAGINATION_COUNT_TIMEOUT', default=30)
+)
+
+PAGINATION_ESTIMATE_THRESHOLD = int(
+    os.getenv('PAGINATION_ESTIMATE_THRESHOLD', default=100000)
+)
+
+REFERENCE_CACHE_TIMEOUT = int(
+    os.getenv('REFERENCE_CACHE_TIMEOUT', default=60 * 60)
+)
+
+RECIPE_LIST_CACHE_TIMEOUT = int(
+    os.getenv('RECIPE_LIST_CACHE_TIMEOUT', default=60)
+)
+
+RECIPE_FRAGMENT_CACHE_TIMEOUT = int(
+    os.getenv('RECIPE_FRAGMENT_CACHE_TIMEOUT', default=60 * 60 * 24)
+)
+
+MEMBERSHIP_CACHE_TIMEOUT = int(
+    os.getenv('MEMBERSHIP_CACHE_TIMEOUT', default=60 * 60 * 24)
+)
+
+MEMBERSHIP_PROCESS_CACHE_TIMEOUT = int(
+    os.getenv('MEMBERSHIP_PROCESS_CACHE_TIMEOUT', default=5)
+)
+
+IMAGE_VARIANT_QUALITY = int(
+    os.getenv('IMAGE_VARIANT_QUALITY', default=80)
+)
+
+BULK_RECIPES_LIMIT = int(
+    os.getenv('BULK_RECIPES_LIMIT', default=100)
+)
+
+FEED_FANOUT_LIMIT = int(
+    os.getenv('FEED_FANOUT_LIMIT', default=1000)
+)
+
+FEED_BACKFILL_LIMIT = int(
+    os.getenv('FEED_BACKFILL_LIMIT', default=100)
+)
+
+AUTH_TOKEN_CACHE_TIMEOUT = int(
+    os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', default=300)
+)
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', default='')
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -112,7 +228,7 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.AllowAny",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
     ],
 }
 
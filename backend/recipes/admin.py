@@ -34,7 +34,9 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = (
         'id', 'author', 'name',
         'text', 'cooking_time', 'pub_date',
+        'favorites_count', 'in_carts_count',
     )
+    readonly_fields = ('favorites_count', 'in_carts_count',)
     search_fields = ('name', 'author', 'tags',)
     list_filter = ('name', 'author', 'tags',)
     empty_value_display = '-пусто-'
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class RecipesConfig(AppConfig):
     name = 'recipes'
+
+    def ready(self):
+        """Connects recipes signal handlers."""
+        import recipes.signals  # noqa: F401
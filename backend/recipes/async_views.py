@@ -0,0 +1,106 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+
+from foodgram.db_router import database_sync_to_async, get_client_key
+from recipes.ingredient_index import VERSION_NAME as INGREDIENTS_VERSION
+from recipes.list_cache import get_list_key
+from recipes.views import (REFERENCE_KEY, TAGS_VERSION, IngredientViewSet,
+                           RecipeViewSet, TagViewSet, get_reference_state,
+                           set_reference_headers)
+
+READ_METHODS = ('GET',)
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+get_reference_state_async = sync_to_async(
+    get_reference_state, thread_sensitive=False
+)
+get_list_key_async = sync_to_async(get_list_key, thread_sensitive=False)
+cache_get = sync_to_async(cache.get, thread_sensitive=False)
+
+
+def async_read(sync_view):
+    """Decorator turning a read handler into an ASGI view.
+
+    Django 3.2 has no async ORM, so database work of reads is done by
+    the sync DRF view in a thread of the pool. Other methods than GET
+    are served by it in the thread shared by thread sensitive code.
+    """
+    run_sync_view = database_sync_to_async(sync_view)
+    run_write_view = sync_to_async(sync_view)
+
+    def decorator(read):
+        @wraps(read)
+        async def view(request, *args, **kwargs):
+            if request.method in READ_METHODS:
+                return await read(request, run_sync_view, *args, **kwargs)
+            return await run_write_view(request, *args, **kwargs)
+
+        view.csrf_exempt = True
+        return view
+
+    return decorator
+
+
+async def reference_response(request, version_name, run_sync_view, **kwargs):
+    """Serves reference data from the cache without leaving the loop.
+
+    Conditional requests and cache hits are answered by the event loop,
+    misses are rendered and cached by the sync view in a thread.
+    """
+    version, etag, last_modified = await get_reference_state_async(
+        version_name
+    )
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        data = await cache_get(REFERENCE_KEY.format(
+            version_name, version, request.get_full_path()
+        ))
+        if data is None:
+            return await run_sync_view(request, **kwargs)
+        response = JsonResponse(data, safe=False, json_dumps_params=JSON_PARAMS)
+    return set_reference_headers(response, etag, last_modified)
+
+
+@async_read(TagViewSet.as_view({'get': 'list', 'post': 'create'}))
+async def tag_list(request, run_sync_view):
+    """Tag list served asynchronously."""
+    return await reference_response(request, TAGS_VERSION, run_sync_view)
+
+
+@async_read(IngredientViewSet.as_view({'get': 'list'}))
+async def ingredient_list(request, run_sync_view):
+    """Ingredient list and name search served asynchronously."""
+    return await reference_response(
+        request, INGREDIENTS_VERSION, run_sync_view
+    )
+
+
+@async_read(RecipeViewSet.as_view({'get': 'list', 'post': 'create'}))
+async def recipe_list(request, run_sync_view):
+    """Recipe list, shared pages are served to anonymous users on the loop.
+
+    Other requests and cache misses are served by the sync view in a thread.
+    """
+    if get_client_key(request) is None:
+        key = await get_list_key_async(request)
+        data = await cache_get(key) if key is not None else None
+        if data is not None:
+            return JsonResponse(data, json_dumps_params=JSON_PARAMS)
+    return await run_sync_view(request)
+
+
+@async_read(RecipeViewSet.as_view({
+    'get': 'retrieve',
+    'put': 'update',
+    'patch': 'partial_update',
+    'delete': 'destroy',
+}))
+async def recipe_detail(request, run_sync_view, pk):
+    """Recipe detail, database work runs in a thread."""
+    return await run_sync_view(request, pk=pk)
@@ -0,0 +1,40 @@
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow, User
+
+
+def change_counters(model, pks, field, delta):
+    """Atomically adds 'delta' to counters of objects, never below zero."""
+    model.objects.filter(pk__in=pks).update(
+        **{field: Greatest(F(field) + delta, Value(0))}
+    )
+
+
+def change_counter(model, pk, field, delta):
+    """Atomically adds 'delta' to a counter column, never below zero."""
+    change_counters(model, (pk,), field, delta)
+
+
+def count_related(model, field):
+    """Returns a subquery counting rows of the model per outer object."""
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), Value(0))
+
+
+def rebuild_counters():
+    """Recalculates every denormalized counter from scratch."""
+    Recipe.objects.update(
+        favorites_count=count_related(Favorite, 'recipe'),
+        in_carts_count=count_related(ShoppingCart, 'recipe'),
+    )
+    User.objects.update(
+        recipes_count=count_related(Recipe, 'author'),
+        followers_count=count_related(Follow, 'author'),
+    )
@@ -0,0 +1,102 @@
+from itertools import product
+
+from django.conf import settings
+from django.db.models import Q
+
+from recipes.models import FeedEntry, Recipe
+from users.models import Follow, User
+
+BATCH_SIZE = 1000
+
+
+def is_read_fanout(author_id):
+    """Checks if the author has too many followers to fan out on write."""
+    return User.objects.filter(
+        pk=author_id, followers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def get_feed(queryset, user):
+    """Filters recipes down to the subscription feed of the user.
+
+    Recipes of most authors come from the user's feed entries, recipes
+    of authors with more than FEED_FANOUT_LIMIT followers are read
+    directly from the recipe table.
+    """
+    read_fanout_authors = Follow.objects.filter(
+        user=user,
+        author__followers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).values('author_id')
+    return queryset.filter(
+        Q(id__in=FeedEntry.objects.filter(user=user).values('recipe_id'))
+        | Q(author__in=read_fanout_authors)
+    )
+
+
+def add_entries(user_ids, recipe_ids):
+    """Inserts feed entries for every user and recipe pair."""
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, recipe_id=recipe_id)
+            for user_id, recipe_id in product(user_ids, recipe_ids)
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_recipe(recipe_id, author_id):
+    """Adds a published recipe to feeds of the author's followers."""
+    if is_read_fanout(author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    add_entries(list(followers), (recipe_id,))
+
+
+def backfill_feed(user_ids, author_id):
+    """Adds the latest FEED_BACKFILL_LIMIT recipes of the author to feeds."""
+    recipes = Recipe.objects.filter(
+        author_id=author_id
+    ).order_by('-pub_date', '-id').values_list('id', flat=True)
+    add_entries(user_ids, list(recipes[:settings.FEED_BACKFILL_LIMIT]))
+
+
+def follow_added(user_id, author_id):
+    """Backfills the feed of a new follower."""
+    if not is_read_fanout(author_id):
+        backfill_feed((user_id,), author_id)
+
+
+def follow_removed(user_id, author_id):
+    """Removes the author's recipes from the feed of a former follower.
+
+    When the author drops back to FEED_FANOUT_LIMIT followers, their
+    recipes are no longer read directly, so feeds of the remaining
+    followers are backfilled.
+    """
+    FeedEntry.objects.filter(
+        user_id=user_id, recipe__author_id=author_id
+    ).delete()
+    if User.objects.filter(
+        pk=author_id, followers_count=settings.FEED_FANOUT_LIMIT
+    ).exists():
+        followers = Follow.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True)
+        backfill_feed(list(followers), author_id)
+
+
+def rebuild_feeds():
+    """Refills feed entries of every follower from scratch."""
+    FeedEntry.objects.all().delete()
+    authors = User.objects.filter(
+        following__isnull=False,
+        followers_count__lte=settings.FEED_FANOUT_LIMIT,
+    ).distinct().values_list('id', flat=True)
+    for author_id in authors.iterator():
+        followers = Follow.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True)
+        backfill_feed(list(followers), author_id)
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from api.cache import bump_version, get_version
+
+FRAGMENTS_VERSION = 'recipe_fragments'
+FRAGMENT_KEY = 'recipe_fragment:{}:{}'
+
+
+def get_fragment_keys(recipe_ids):
+    """Returns cache keys of serialized recipes by recipe id."""
+    version = get_version(FRAGMENTS_VERSION)
+    return {
+        recipe_id: FRAGMENT_KEY.format(version, recipe_id)
+        for recipe_id in recipe_ids
+    }
+
+
+def get_fragments(recipe_ids):
+    """Returns cached serialized recipes by id with one cache lookup."""
+    keys = get_fragment_keys(recipe_ids)
+    cached = cache.get_many(keys.values())
+    return {
+        recipe_id: cached[key] for recipe_id, key in keys.items()
+        if key in cached
+    }
+
+
+def set_fragments(fragments):
+    """Caches serialized recipes given by recipe id."""
+    keys = get_fragment_keys(fragments)
+    cache.set_many(
+        {keys[recipe_id]: data for recipe_id, data in fragments.items()},
+        settings.RECIPE_FRAGMENT_CACHE_TIMEOUT
+    )
+
+
+def evict_fragments(recipe_ids):
+    """Evicts serialized recipes once the transaction is committed."""
+    recipe_ids = tuple(recipe_ids)
+    transaction.on_commit(
+        lambda: cache.delete_many(get_fragment_keys(recipe_ids).values())
+    )
+
+
+def invalidate_fragments():
+    """Invalidates every serialized recipe, for changes of shared data.
+
+    Used when tags, ingredients or authors embedded in many recipes change.
+    """
+    transaction.on_commit(lambda: bump_version(FRAGMENTS_VERSION))
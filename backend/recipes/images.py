@@ -0,0 +1,117 @@
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from PIL import Image, ImageOps
+
+from recipes.list_cache import invalidate_lists
+from recipes.models import Recipe
+from recipes.workers import submit
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = 'recipes/image/variants/'
+VARIANTS = {
+    'thumbnail': ((160, 160), True),
+    'card': ((480, 320), True),
+    'full': ((1280, 1280), False),
+}
+FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+
+
+def get_variant_name(image_name, variant, image_format):
+    """Returns storage name of an image variant."""
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    extension = FORMATS[image_format][1]
+    return f'{VARIANTS_DIR}{stem}_{variant}.{extension}'
+
+
+def resize(image, size, crop):
+    """Crops the image to the size or fits it inside the size."""
+    if crop:
+        return ImageOps.fit(image, size, Image.LANCZOS)
+    image = image.copy()
+    image.thumbnail(size, Image.LANCZOS)
+    return image
+
+
+def render_variants(image_name):
+    """Saves every size and format variant of a stored image.
+
+    Runs in a worker process and only uses the storage.
+    """
+    with default_storage.open(image_name) as source:
+        image = Image.open(source)
+        image.load()
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    for variant, (size, crop) in VARIANTS.items():
+        resized = resize(image, size, crop)
+        for image_format, (pil_format, _) in FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(
+                buffer, pil_format, quality=settings.IMAGE_VARIANT_QUALITY
+            )
+            name = get_variant_name(image_name, variant, image_format)
+            default_storage.delete(name)
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+    return image_name
+
+
+def mark_variants_ready(recipe_id, image_name):
+    """Records that variants exist unless the image has been replaced."""
+    if Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+        image_variants_source=image_name
+    ):
+        invalidate_lists()
+
+
+def _variants_done(recipe_id, future):
+    """Marks variants ready when the worker job finishes."""
+    if future.exception() is not None:
+        return
+    try:
+        mark_variants_ready(recipe_id, future.result())
+    finally:
+        connection.close()
+
+
+def schedule_variants(recipe_id, image_name):
+    """Queues generating variants of the recipe image in a worker.
+
+    Called after the recipe is committed, so a failure is only logged:
+    the recipe is served with its original image.
+    """
+    try:
+        future = submit(render_variants, image_name)
+    except Exception:
+        logger.exception(
+            'Не удалось запланировать варианты изображения %s.', image_name
+        )
+        return
+    future.add_done_callback(
+        lambda done: _variants_done(recipe_id, done)
+    )
+
+
+def get_variant_urls(recipe, request=None):
+    """Returns variant URLs by size and format or None if not ready."""
+    if not recipe.image or recipe.image_variants_source != recipe.image.name:
+        return None
+    urls = {}
+    for variant in VARIANTS:
+        urls[variant] = {}
+        for image_format in FORMATS:
+            url = default_storage.url(
+                get_variant_name(recipe.image.name, variant, image_format)
+            )
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[variant][image_format] = url
+    return urls
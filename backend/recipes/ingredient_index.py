@@ -0,0 +1,61 @@
+import threading
+from bisect import bisect_left
+
+from api.cache import get_version
+from foodgram.db_router import primary_reads
+from recipes.models import Ingredient
+
+VERSION_NAME = 'ingredients'
+
+
+class IngredientIndex:
+    """In-memory sorted index over lower-cased ingredient names.
+
+    The index is built from the database on first use and rebuilt
+    whenever the 'ingredients' cache version is bumped, so every
+    worker process picks up changes made by the others.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._keys = []
+        self._rows = []
+
+    def _refresh(self):
+        """Rebuilds the index if ingredients have changed."""
+        version = get_version(VERSION_NAME)
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            with primary_reads():
+                ingredients = sorted(
+                    Ingredient.objects.values(
+                        'id', 'name', 'measurement_unit'
+                    ),
+                    key=lambda row: (row['name'].lower(), row['id'])
+                )
+            self._keys, self._rows = (
+                [row['name'].lower() for row in ingredients], ingredients
+            )
+            self._version = version
+
+    def search(self, query, limit):
+        """Returns at most 'limit' ingredients whose names start with query.
+
+        Matches are found with bisect in alphabetical order, the exact
+        match being the first of them, as '^name' search returned them.
+        """
+        self._refresh()
+        keys, rows = self._keys, self._rows
+        query = query.lower()
+        start = end = bisect_left(keys, query)
+        stop = min(len(keys), start + limit)
+        while end < stop and keys[end].startswith(query):
+            end += 1
+        return rows[start:end]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,67 @@
+import hashlib
+
+from django.db import transaction
+
+from api.cache import bump_version, get_version
+
+CATALOGUE_VERSION = 'recipe_catalogue'
+LIST_KEY = 'recipe_list:{}:{}'
+LIST_PARAMS = ('tags', 'tags_mode', 'author', 'page', 'limit')
+
+
+def get_list_key(request):
+    """Returns cache key of a recipe list page or None if it is not shared.
+
+    Only pages filtered by tags and author are shared. The query is
+    normalized, so the order of parameters and repeated tags do not
+    matter, and the key includes the recipe catalogue version.
+    """
+    params = request.GET
+    if not set(params) <= set(LIST_PARAMS):
+        return None
+    query = (
+        request.scheme,
+        request.get_host(),
+        sorted(set(params.getlist('tags'))),
+        params.get('tags_mode', 'any'),
+        params.get('author', ''),
+        params.get('page', '1'),
+        params.get('limit', ''),
+    )
+    digest = hashlib.sha256(repr(query).encode('utf-8')).hexdigest()
+    return LIST_KEY.format(get_version(CATALOGUE_VERSION), digest)
+
+
+def add_user_flags(data, memberships):
+    """Returns a shared list page with flags of the user merged in.
+
+    Shared pages are rendered for an anonymous user, so recipes the user
+    has not marked are returned as they are.
+    """
+    favorites = memberships['favorites']
+    shopping_list = memberships['shopping_list']
+    following = memberships['following']
+    if not (favorites or shopping_list or following):
+        return data
+    results = []
+    for recipe in data['results']:
+        recipe = dict(
+            recipe,
+            is_favorited=recipe['id'] in favorites,
+            is_in_shopping_cart=recipe['id'] in shopping_list,
+        )
+        recipe['author'] = dict(
+            recipe['author'],
+            is_subscribed=recipe['author']['id'] in following,
+        )
+        results.append(recipe)
+    return dict(data, results=results)
+
+
+def invalidate_lists():
+    """Invalidates shared list pages once the transaction is committed.
+
+    Pages cached by concurrent requests before the commit are built
+    for the previous version, so they are never served afterwards.
+    """
+    transaction.on_commit(lambda: bump_version(CATALOGUE_VERSION))
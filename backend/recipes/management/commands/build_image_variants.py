@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from recipes.images import mark_variants_ready, render_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Generating resized copies of existing recipe images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Regenerate copies that already exist.',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('Command start'))
+        recipes = Recipe.objects.exclude(image='')
+        if not options['force']:
+            recipes = recipes.exclude(image_variants_source=F('image'))
+        done = failed = 0
+        for recipe_id, image_name in recipes.values_list('id', 'image'):
+            try:
+                render_variants(image_name)
+            except (OSError, ValueError) as error:
+                failed += 1
+                self.stderr.write(f'{image_name}: {error}')
+                continue
+            mark_variants_ready(recipe_id, image_name)
+            done += 1
+            self.stdout.write(f'Обработано изображений: {done}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {done}, с ошибками: {failed}'
+        ))
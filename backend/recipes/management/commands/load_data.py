@@ -1,27 +1,166 @@
+import csv
 import json
+import os
+from itertools import islice
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
+from api.cache import bump_version
+from recipes.ingredient_index import VERSION_NAME as INGREDIENTS_VERSION
 from recipes.models import Ingredient, Tag
+from recipes.tag_map import VERSION_NAME as TAGS_VERSION
+
+DATA_DIR = os.path.join(settings.BASE_DIR, 'data')
+CHUNK_SIZE = 64 * 1024
+SEPARATORS = ' \t\r\n,'
+
+
+def iter_json_array(data_file):
+    """Yields objects of a JSON array reading the file by chunks."""
+    decoder = json.JSONDecoder()
+    buffer = data_file.read(CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидался JSON-массив.')
+    position = 1
+    while True:
+        while position < len(buffer) and buffer[position] in SEPARATORS:
+            position += 1
+        if buffer.startswith(']', position):
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = data_file.read(CHUNK_SIZE)
+            if not chunk:
+                raise CommandError('Неожиданный конец JSON-файла.')
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield item
+
+
+def iter_rows(path, fields):
+    """Yields dictionaries from a JSON array or a headerless CSV file."""
+    with open(path, encoding='utf-8', newline='') as data_file:
+        if path.endswith('.csv'):
+            for row in csv.reader(data_file):
+                if row:
+                    yield dict(zip(fields, row))
+        else:
+            for item in iter_json_array(data_file):
+                yield {field: item[field] for field in fields}
+
+
+def iter_batches(rows, batch_size):
+    """Splits an iterable into lists of 'batch_size' items."""
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
 
 
 class Command(BaseCommand):
     help = 'Downloading ingredients and tags.'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ingredients',
+            default=os.path.join(DATA_DIR, 'ingredients.json'),
+            help='JSON or CSV file with ingredients.',
+        )
+        parser.add_argument(
+            '--tags',
+            default=os.path.join(DATA_DIR, 'tags.json'),
+            help='JSON or CSV file with tags.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of rows inserted by one query.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help=(
+                'Show rows missing from the database and rows skipped as '
+                'conflicts without saving them.'
+            ),
+        )
+
+    def load(self, model, path, fields, keys, batch_size, dry_run):
+        """Streams rows from the file into the model table.
+
+        'keys' are the unique field sets of the model. Rows matching
+        a row in the database or earlier in the file by any of them are
+        skipped, so the command may be run repeatedly.
+        """
+        taken = {key: set(model.objects.values_list(*key)) for key in keys}
+        processed = created = 0
+        name = model._meta.verbose_name_plural
+        for batch in iter_batches(iter_rows(path, fields), batch_size):
+            new = []
+            for row in batch:
+                values = {
+                    key: tuple(row[field] for field in key) for key in keys
+                }
+                conflicts = [
+                    key for key in keys if values[key] in taken[key]
+                ]
+                if conflicts:
+                    if dry_run:
+                        self.write_row('!', row, fields, conflicts)
+                    continue
+                for key in keys:
+                    taken[key].add(values[key])
+                new.append(row)
+            processed += len(batch)
+            created += len(new)
+            if dry_run:
+                for row in new:
+                    self.write_row('+', row, fields)
+            else:
+                model.objects.bulk_create(
+                    (model(**row) for row in new),
+                    batch_size=batch_size, ignore_conflicts=True,
+                )
+            self.stdout.write(f'{name}: обработано {processed}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{name}: новых {created}, пропущено {processed - created}'
+        ))
+        return created
+
+    def write_row(self, mark, row, fields, conflicts=()):
+        """Prints a row of the dry run with fields it conflicts by."""
+        line = f'{mark} ' + ', '.join(str(row[field]) for field in fields)
+        if conflicts:
+            line += ' (конфликт: {})'.format(
+                '; '.join(', '.join(key) for key in conflicts)
+            )
+        self.stdout.write(line)
+
     def handle(self, *args, **options):
         self.stdout.write(self.style.WARNING('Command start'))
-        with open(
-            'data/ingredients.json', encoding='utf-8',
-        ) as data_file_ingredients:
-            ingredient_data = json.loads(data_file_ingredients.read())
-            for ingredients in ingredient_data:
-                Ingredient.objects.get_or_create(**ingredients)
-
-        with open(
-            'data/tags.json', encoding='utf-8',
-        ) as data_file_tags:
-            tags_data = json.loads(data_file_tags.read())
-            for tags in tags_data:
-                Tag.objects.get_or_create(**tags)
-
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        if batch_size < 1:
+            raise CommandError('Размер пакета должен быть больше нуля.')
+        with transaction.atomic():
+            ingredients = self.load(
+                Ingredient, options['ingredients'],
+                ('name', 'measurement_unit'), (('name', 'measurement_unit'),),
+                batch_size, dry_run,
+            )
+            tags = self.load(
+                Tag, options['tags'], ('name', 'color', 'slug'),
+                (('slug',), ('name',), ('color',)), batch_size, dry_run,
+            )
+        if dry_run:
+            self.stdout.write(
+                self.style.WARNING('Пробный запуск, изменений нет')
+            )
+            return
+        if ingredients:
+            bump_version(INGREDIENTS_VERSION)
+        if tags:
+            bump_version(TAGS_VERSION)
         self.stdout.write(self.style.SUCCESS('Данные загружены'))
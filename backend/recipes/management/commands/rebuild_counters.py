@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Recalculating favorites, carts, recipes and followers counters.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('Command start'))
+        with transaction.atomic():
+            rebuild_counters()
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны'))
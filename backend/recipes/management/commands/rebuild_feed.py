@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.feed import rebuild_feeds
+
+
+class Command(BaseCommand):
+    help = 'Refilling subscription feeds from followed authors recipes.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('Command start'))
+        with transaction.atomic():
+            rebuild_feeds()
+        self.stdout.write(self.style.SUCCESS('Ленты подписок заполнены'))
@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from api.cache import bump_version, get_version, is_cache_shared
+from foodgram.db_router import primary_reads
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+
+MEMBERSHIP_KEY = 'membership:{}:{}:{}'
+VERSION_NAME = 'memberships:{}'
+MEMBERSHIPS = {
+    'favorites': (Favorite, 'recipe_id'),
+    'shopping_list': (ShoppingCart, 'recipe_id'),
+    'following': (Follow, 'author_id'),
+}
+
+
+def get_membership_timeout():
+    """Returns how long membership sets are cached."""
+    if is_cache_shared():
+        return settings.MEMBERSHIP_CACHE_TIMEOUT
+    return settings.MEMBERSHIP_PROCESS_CACHE_TIMEOUT
+
+
+def get_membership_keys(user_id, names):
+    """Returns cache keys of the user's sets by name."""
+    version = get_version(VERSION_NAME.format(user_id))
+    return {
+        name: MEMBERSHIP_KEY.format(name, user_id, version) for name in names
+    }
+
+
+def load_memberships(user, names):
+    """Returns the named sets of recipe or author ids related to the user.
+
+    Sets are read with one cache lookup, missing ones are loaded from
+    the database and cached until 'evict_memberships' is called. A
+    process cache misses evictions made by other workers, so there
+    sets live only MEMBERSHIP_PROCESS_CACHE_TIMEOUT seconds.
+    """
+    if user.is_anonymous:
+        return {name: frozenset() for name in names}
+    keys = get_membership_keys(user.id, names)
+    cached = cache.get_many(keys.values())
+    memberships = {}
+    loaded = {}
+    for name, key in keys.items():
+        if key in cached:
+            memberships[name] = cached[key]
+            continue
+        model, field = MEMBERSHIPS[name]
+        with primary_reads():
+            memberships[name] = loaded[key] = frozenset(
+                model.objects.filter(user=user).values_list(field, flat=True)
+            )
+    if loaded:
+        cache.set_many(loaded, get_membership_timeout())
+    return memberships
+
+
+def get_membership(user, name):
+    """Returns a set of recipe or author ids related to the user."""
+    return load_memberships(user, (name,))[name]
+
+
+def get_memberships(user):
+    """Returns every membership set of the user by its name."""
+    return load_memberships(user, MEMBERSHIPS)
+
+
+def evict_memberships(user_id):
+    """Invalidates cached sets of the user once the transaction is committed.
+
+    Nothing changes if the transaction is rolled back. Sets loaded by
+    concurrent requests before the commit are cached for the previous
+    version, so they are never served afterwards.
+    """
+    transaction.on_commit(lambda: bump_version(VERSION_NAME.format(user_id)))
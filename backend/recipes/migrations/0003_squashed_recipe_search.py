@@ -0,0 +1,65 @@
+# Generated by Django 3.2.16 on 2026-10-18 01:59
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+SEARCH_INDEXES = (
+    GinIndex(
+        SearchVector('name', 'text', config='russian'),
+        name='recipe_search_vector_idx'
+    ),
+    GinIndex(
+        fields=('name',),
+        name='recipe_name_trigram_idx',
+        opclasses=('gin_trgm_ops',)
+    ),
+)
+
+
+def create_search_indexes(apps, schema_editor):
+    """Creates search indexes on PostgreSQL, other engines search in memory.
+
+    Indexes are kept out of the model state, so SQLite never
+    has to rebuild them when the recipe table is altered.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Recipe = apps.get_model('recipes', 'Recipe')
+    for index in SEARCH_INDEXES:
+        schema_editor.add_index(Recipe, index)
+
+
+def drop_search_indexes(apps, schema_editor):
+    """Drops search indexes on PostgreSQL."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Recipe = apps.get_model('recipes', 'Recipe')
+    for index in SEARCH_INDEXES:
+        schema_editor.remove_index(Recipe, index)
+
+
+class Migration(migrations.Migration):
+
+    # Replaces 0003 without editing it: databases that applied 0003 keep
+    # its indexes, new ones never add the indexes to the model state,
+    # which SQLite would try to recreate when rebuilding the table.
+    replaces = [('recipes', '0003_recipe_search')]
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AlterModelOptions(
+            name='favorite',
+            options={'default_related_name': 'favorites', 'verbose_name': 'Избранное', 'verbose_name_plural': 'Избранные'},
+        ),
+        migrations.AlterModelOptions(
+            name='shoppingcart',
+            options={'default_related_name': 'shopping_list', 'verbose_name': 'Корзина', 'verbose_name_plural': 'Корзины'},
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
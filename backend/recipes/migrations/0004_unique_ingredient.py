@@ -0,0 +1,59 @@
+# Generated by Django 3.2.16 on 2026-10-18 02:02
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def remove_duplicate_ingredients(apps, schema_editor):
+    """Merges ingredients with the same name and measurement unit.
+
+    A recipe using several of the duplicates keeps one row with
+    their amounts summed.
+    """
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientRecipe = apps.get_model('recipes', 'IngredientRecipe')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(keep=Min('id'), total=Count('id')).filter(total__gt=1)
+    for duplicate in duplicates:
+        ids = list(Ingredient.objects.filter(
+            name=duplicate['name'],
+            measurement_unit=duplicate['measurement_unit'],
+        ).values_list('id', flat=True))
+        merged = list(IngredientRecipe.objects.filter(
+            ingredient_id__in=ids
+        ).values('recipe_id').annotate(
+            amount=Sum('amount'), rows=Count('id')
+        ).filter(rows__gt=1))
+        for recipe in merged:
+            IngredientRecipe.objects.filter(
+                recipe_id=recipe['recipe_id'], ingredient_id__in=ids
+            ).delete()
+            IngredientRecipe.objects.create(
+                recipe_id=recipe['recipe_id'],
+                ingredient_id=duplicate['keep'],
+                amount=recipe['amount'],
+            )
+        IngredientRecipe.objects.filter(
+            ingredient_id__in=ids
+        ).update(ingredient_id=duplicate['keep'])
+        Ingredient.objects.filter(id__in=ids).exclude(
+            id=duplicate['keep']
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_recipe_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.2.16 on 2026-10-18 04:10
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_carts(apps, schema_editor):
+    """Removes repeated recipes from carts and recounts cart totals."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    duplicates = ShoppingCart.objects.values(
+        'user', 'recipe'
+    ).annotate(keep=Min('id'), total=Count('id')).filter(total__gt=1)
+    recipe_ids = set()
+    for duplicate in duplicates:
+        ShoppingCart.objects.filter(
+            user_id=duplicate['user'], recipe_id=duplicate['recipe']
+        ).exclude(id=duplicate['keep']).delete()
+        recipe_ids.add(duplicate['recipe'])
+    Recipe.objects.filter(id__in=recipe_ids).update(
+        in_carts_count=Coalesce(Subquery(
+            ShoppingCart.objects.filter(
+                recipe=OuterRef('pk')
+            ).order_by().values('recipe').annotate(
+                total=Count('pk')
+            ).values('total')
+        ), Value(0))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_carts, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_shopping_cart'),
+        ),
+    ]
@@ -51,6 +51,12 @@ class Ingredient(models.Model):
         """Model's meta parameters."""
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('name', 'measurement_unit',),
+                name='unique_ingredient'
+            )
+        ]
 
     def __str__(self) -> str:
         """String representation method."""
@@ -77,6 +83,12 @@ class Recipe(models.Model):
         upload_to='recipes/image/',
         verbose_name='Изображение'
     )
+    image_variants_source = models.CharField(
+        max_length=100,
+        blank=True,
+        editable=False,
+        verbose_name='Изображение с готовыми копиями'
+    )
     text = models.TextField(verbose_name='Рецепт')
     cooking_time = models.PositiveSmallIntegerField(
         validators=[MinValueValidator(
@@ -93,12 +105,27 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата создания рецепта'
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном'
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В корзинах'
+    )
 
     class Meta:
         """Model's meta parameters."""
         ordering = ('-pub_date',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'), name='recipe_pub_date_id_idx'
+            ),
+        )
 
     def __str__(self) -> str:
         """String representation method."""
@@ -193,6 +220,43 @@ class ShoppingCart(models.Model):
         verbose_name = 'Корзина'
         verbose_name_plural = 'Корзины'
         default_related_name = 'shopping_list'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe',),
+                name='unique_shopping_cart'
+            )
+        ]
+
+    def __str__(self) -> str:
+        """String representation method."""
+        return f'{self.user}, {self.recipe}'
+
+
+class FeedEntry(models.Model):
+    """Recipe in the subscription feed of a user."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Пользователь'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+
+    class Meta:
+        """Model's meta parameters."""
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe',),
+                name='unique_feed_entry'
+            )
+        ]
 
     def __str__(self) -> str:
         """String representation method."""
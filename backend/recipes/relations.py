@@ -0,0 +1,84 @@
+from contextvars import ContextVar
+
+from django.db import transaction
+
+from recipes.counters import change_counters
+from recipes.membership import evict_memberships
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.shopping_list import evict_document
+
+RELATIONS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'in_carts_count',
+}
+
+bulk_change = ContextVar('bulk_change', default=False)
+
+
+def relations_changed(model, user_id, recipe_ids, delta):
+    """Applies what signal handlers do for a batch of relations.
+
+    Bulk inserts send no signals and handlers skip rows deleted within
+    'bulk_change', so counters, cached membership sets and cached
+    documents are updated here at once.
+    """
+    if not recipe_ids:
+        return
+    change_counters(Recipe, recipe_ids, RELATIONS[model], delta)
+    evict_memberships(user_id)
+    if model is ShoppingCart:
+        evict_document(user_id)
+
+
+@transaction.atomic
+def add_recipes(model, user, recipe_ids):
+    """Adds recipes to favorites or cart, returns ids actually added.
+
+    Recipe rows are locked first. Relations inserted concurrently hold
+    a key share lock on them, so they are committed and found among
+    existing ones before anything is counted as added.
+    """
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    list(
+        Recipe.objects.select_for_update().filter(
+            id__in=recipe_ids
+        ).order_by('pk').values_list('pk', flat=True)
+    )
+    existing = set(
+        model.objects.filter(
+            user=user, recipe_id__in=recipe_ids
+        ).values_list('recipe_id', flat=True)
+    )
+    added = [
+        recipe_id for recipe_id in recipe_ids if recipe_id not in existing
+    ]
+    model.objects.bulk_create(
+        [model(user=user, recipe_id=recipe_id) for recipe_id in added],
+        ignore_conflicts=True,
+    )
+    relations_changed(model, user.id, added, 1)
+    return added
+
+
+@transaction.atomic
+def remove_recipes(model, user, recipe_ids):
+    """Removes recipes from favorites or cart, returns ids removed.
+
+    Rows are locked before they are deleted, so only rows deleted here
+    are counted. Signal handlers skip them, counters of the batch are
+    changed by one query.
+    """
+    locked = dict(
+        model.objects.filter(
+            user=user, recipe_id__in=recipe_ids
+        ).select_for_update().values_list('pk', 'recipe_id')
+    )
+    if locked:
+        token = bulk_change.set(True)
+        try:
+            model.objects.filter(pk__in=locked).delete()
+        finally:
+            bulk_change.reset(token)
+    removed = list(locked.values())
+    relations_changed(model, user.id, removed, -1)
+    return removed
@@ -0,0 +1,225 @@
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, TrigramSimilarity)
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, When
+
+from api.cache import bump_version, get_version
+from foodgram.db_router import primary_reads
+from recipes.models import Recipe
+
+VERSION_NAME = 'recipe_search'
+CHANGE_KEY = 'recipe_search:change:{}'
+CHANGE_TIMEOUT = 60 * 60 * 24
+MAX_CHANGES = 100
+SEARCH_CONFIG = 'russian'
+NAME_WEIGHT = 2
+TEXT_WEIGHT = 1
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Splits text into lower-cased word tokens."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class RecipeSearchIndex:
+    """In-memory inverted index over recipe names and texts.
+
+    Used instead of PostgreSQL full-text search on other engines.
+    Every recipe change bumps the 'recipe_search' cache version and
+    records the recipe id under the new version, so each process
+    reindexes only recipes changed since its version. The index is
+    rebuilt when changes are too many or no longer cached.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._state = ([], {}, {})
+        self._terms = {}
+
+    def _get_changes(self, version):
+        """Returns ids of recipes changed since the indexed version."""
+        if (self._version is None
+                or not 0 < version - self._version <= MAX_CHANGES):
+            return None
+        keys = [
+            CHANGE_KEY.format(number)
+            for number in range(self._version + 1, version + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) < len(keys):
+            return None
+        return set(changes.values())
+
+    def _refresh(self):
+        """Updates the index if recipes have changed."""
+        version = get_version(VERSION_NAME)
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            changed = self._get_changes(version)
+            recipes = Recipe.objects.values_list(
+                'id', 'name', 'text', 'pub_date'
+            )
+            if changed is not None:
+                recipes = recipes.filter(id__in=changed)
+            with primary_reads():
+                recipes = list(recipes)
+            if changed is None:
+                self._terms = {}
+                self._state = self._update(([], {}, {}), (), recipes)
+            else:
+                self._state = self._update(self._state, changed, recipes)
+            self._version = version
+
+    def _update(self, state, changed, recipes):
+        """Returns a new index state with changed recipes reindexed.
+
+        Only postings of affected tokens are copied, and searches keep
+        reading the previous state until the new one replaces it.
+        """
+        tokens, postings, dates = state
+        tokens, postings, dates = list(tokens), dict(postings), dict(dates)
+        copied = set()
+
+        def get_weights(token):
+            if token not in copied:
+                copied.add(token)
+                postings[token] = dict(postings.get(token, {}))
+            return postings[token]
+
+        for recipe_id in changed:
+            dates.pop(recipe_id, None)
+            for token in self._terms.pop(recipe_id, ()):
+                weights = get_weights(token)
+                del weights[recipe_id]
+                if not weights:
+                    del postings[token]
+                    copied.discard(token)
+                    del tokens[bisect_left(tokens, token)]
+        for recipe_id, name, text, pub_date in recipes:
+            dates[recipe_id] = pub_date
+            weights = dict.fromkeys(tokenize(text), TEXT_WEIGHT)
+            weights.update(dict.fromkeys(tokenize(name), NAME_WEIGHT))
+            self._terms[recipe_id] = tuple(weights)
+            for token, weight in weights.items():
+                if token not in postings:
+                    insort(tokens, token)
+                get_weights(token)[recipe_id] = weight
+        return tokens, postings, dates
+
+    @staticmethod
+    def _match_token(state, query_token):
+        """Returns recipe weights for index tokens starting with the token."""
+        tokens, postings, _ = state
+        weights = {}
+        position = bisect_left(tokens, query_token)
+        while (position < len(tokens)
+               and tokens[position].startswith(query_token)):
+            for recipe_id, weight in postings[tokens[position]].items():
+                weights[recipe_id] = max(weight, weights.get(recipe_id, 0))
+            position += 1
+        return weights
+
+    def _score(self, state, query):
+        """Returns {recipe id: score} of recipes matching every query word."""
+        scores = None
+        for query_token in tokenize(query):
+            weights = self._match_token(state, query_token)
+            if scores is None:
+                scores = weights
+            else:
+                scores = {
+                    recipe_id: score + weights[recipe_id]
+                    for recipe_id, score in scores.items()
+                    if recipe_id in weights
+                }
+        return scores or {}
+
+    def search(self, query):
+        """Returns {recipe id: score} of recipes matching every query word."""
+        self._refresh()
+        return self._score(self._state, query)
+
+    def top(self, query, limit):
+        """Returns {recipe id: score} of the best 'limit' matches.
+
+        Matches are ranked like the search results, by score and then
+        by the newest publication.
+        """
+        self._refresh()
+        state = self._state
+        dates = state[2]
+        scores = self._score(state, query)
+        best = heapq.nlargest(
+            limit, scores,
+            key=lambda recipe_id: (
+                scores[recipe_id], dates[recipe_id], recipe_id
+            )
+        )
+        return {recipe_id: scores[recipe_id] for recipe_id in best}
+
+
+recipe_search_index = RecipeSearchIndex()
+
+
+def search_postgresql(queryset, query):
+    """Full-text and trigram search backed by the GIN indexes.
+
+    The search vector expression must stay identical to the one
+    indexed by 'recipes.0003_recipe_search' migration.
+    """
+    vector = SearchVector('name', 'text', config=SEARCH_CONFIG)
+    search_query = SearchQuery(query, config=SEARCH_CONFIG)
+    return queryset.annotate(
+        search=vector,
+        rank=(
+            SearchRank(vector, search_query)
+            + TrigramSimilarity('name', query)
+        ),
+    ).filter(
+        Q(search=search_query) | Q(name__trigram_similar=query)
+    ).order_by('-rank', '-pub_date', '-id')
+
+
+def record_change(recipe_id):
+    """Marks the recipe as changed for the index of every process."""
+    version = bump_version(VERSION_NAME)
+    cache.set(CHANGE_KEY.format(version), recipe_id, CHANGE_TIMEOUT)
+
+
+def search_inverted_index(queryset, query):
+    """Search over the in-memory inverted index.
+
+    Only RECIPE_SEARCH_LIMIT best matches are ranked in the query,
+    which keeps it within SQLite limit of query parameters.
+    """
+    scores = recipe_search_index.top(query, settings.RECIPE_SEARCH_LIMIT)
+    return queryset.filter(id__in=scores).annotate(
+        rank=Case(
+            *(When(id=recipe_id, then=score)
+              for recipe_id, score in scores.items()),
+            default=0,
+            output_field=IntegerField(),
+        )
+    ).order_by('-rank', '-pub_date', '-id')
+
+
+def search_recipes(queryset, query):
+    """Filters recipes by the query and orders them by relevance."""
+    query = query.strip()
+    if not query:
+        return queryset
+    if connection.vendor == 'postgresql':
+        return search_postgresql(queryset, query)
+    return search_inverted_index(queryset, query)
@@ -0,0 +1,173 @@
+import hashlib
+import io
+import json
+import logging
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from recipes.models import IngredientRecipe
+from recipes.workers import submit
+
+logger = logging.getLogger(__name__)
+
+FONT_NAME = 'caviar-dreams'
+FONT_PATH = os.path.join(settings.BASE_DIR, 'data', 'caviar-dreams.ttf')
+TITLE = 'Список покупок'
+TITLE_SIZE = 20
+LINE_SIZE = 16
+LINE_HEIGHT = 25
+MARGIN_LEFT = 75
+MARGIN_TOP = 100
+MARGIN_BOTTOM = 50
+
+DOCUMENT_KEY = 'shopping_list:document:{}'
+JOB_KEY = 'shopping_list:job:{}'
+USER_KEY = 'shopping_list:user:{}'
+
+_jobs = {}
+
+
+def register_font():
+    """Registers the shopping list font once per process."""
+    if FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_PATH, 'UTF-8'))
+
+
+def get_shopping_list(user):
+    """Returns ingredients of user's shopping cart summed by the database.
+
+    Rows are grouped by ingredient name and measurement unit, so the
+    result contains one (name, measurement_unit, amount) tuple per product.
+    """
+    return IngredientRecipe.objects.filter(
+        recipe__shopping_list__user=user
+    ).values(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).annotate(
+        total=Sum('amount')
+    ).order_by(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).values_list(
+        'ingredient__name', 'ingredient__measurement_unit', 'total'
+    )
+
+
+def render_shopping_list(items):
+    """Renders (name, measurement_unit, amount) rows to PDF bytes.
+
+    Rows are drawn one by one and a new page is started whenever
+    the current one is full, so carts of any size fit into the document.
+    """
+    register_font()
+    buffer = io.BytesIO()
+    page = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    page.setFont(FONT_NAME, size=TITLE_SIZE)
+    page.drawCentredString(width / 2, height - MARGIN_TOP / 2, TITLE)
+    page.setFont(FONT_NAME, size=LINE_SIZE)
+    line = height - MARGIN_TOP
+    for number, (name, measurement_unit, amount) in enumerate(items, 1):
+        if line < MARGIN_BOTTOM:
+            page.showPage()
+            page.setFont(FONT_NAME, size=LINE_SIZE)
+            line = height - MARGIN_BOTTOM
+        page.drawString(
+            MARGIN_LEFT, line,
+            f'{number}. {name} - {amount} {measurement_unit}'
+        )
+        line -= LINE_HEIGHT
+    page.showPage()
+    page.save()
+    return buffer.getvalue()
+
+
+def get_cart_digest(items):
+    """Returns a content hash of aggregated shopping list rows."""
+    payload = json.dumps(list(items), ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_document(digest):
+    """Returns a cached shopping list document or None."""
+    return cache.get(DOCUMENT_KEY.format(digest))
+
+
+def remember_document(user, digest):
+    """Stores the digest of the user's latest shopping list document."""
+    cache.set(
+        USER_KEY.format(user.id), digest,
+        settings.SHOPPING_LIST_CACHE_TIMEOUT
+    )
+
+
+def get_user_document(user):
+    """Returns the digest of the user's latest shopping list document."""
+    return cache.get(USER_KEY.format(user.id))
+
+
+def evict_document(user_id):
+    """Forgets the user's latest shopping list document.
+
+    Documents are addressed by the cart contents and may be shared by
+    users with the same cart, so only the user's pointer is dropped and
+    the document itself expires with SHOPPING_LIST_CACHE_TIMEOUT.
+    """
+    cache.delete(USER_KEY.format(user_id))
+
+
+def render_document(digest, items):
+    """Renders a shopping list in the current thread and caches it."""
+    document = render_shopping_list(items)
+    cache.set(
+        DOCUMENT_KEY.format(digest), document,
+        settings.SHOPPING_LIST_CACHE_TIMEOUT
+    )
+    return document
+
+
+def _job_done(digest, future):
+    """Stores a rendered document in the cache when its job finishes."""
+    _jobs.pop(digest, None)
+    if future.exception() is None:
+        cache.set(
+            DOCUMENT_KEY.format(digest), future.result(),
+            settings.SHOPPING_LIST_CACHE_TIMEOUT
+        )
+    cache.delete(JOB_KEY.format(digest))
+
+
+def submit_render_job(digest, items):
+    """Queues rendering of a shopping list in the worker process.
+
+    Jobs are addressed by the cart digest, so identical carts
+    share a single job and a single cached document. Documents and job
+    markers are kept in the cache, so with several worker processes
+    polling works only with a cache backend they share. Returns False
+    if the job could not be queued, so the caller renders it itself.
+    """
+    if digest in _jobs:
+        return True
+    try:
+        future = submit(render_shopping_list, list(items))
+    except Exception:
+        logger.exception('Не удалось запланировать список покупок.')
+        return False
+    cache.set(
+        JOB_KEY.format(digest), 'pending',
+        settings.SHOPPING_LIST_JOB_TIMEOUT
+    )
+    _jobs[digest] = future
+    future.add_done_callback(lambda done: _job_done(digest, done))
+    return True
+
+
+def is_job_pending(digest):
+    """Checks if a document for the digest is still being rendered."""
+    return digest in _jobs or cache.get(JOB_KEY.format(digest)) is not None
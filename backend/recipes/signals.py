@@ -0,0 +1,146 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api.cache import bump_version
+from api.paginator import RECIPES_COUNT_VERSION
+from recipes.counters import change_counter
+from recipes.feed import fan_out_recipe
+from recipes.fragments import evict_fragments, invalidate_fragments
+from recipes.images import schedule_variants
+from recipes.ingredient_index import VERSION_NAME as INGREDIENTS_VERSION
+from recipes.list_cache import invalidate_lists
+from recipes.membership import evict_memberships
+from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
+                            ShoppingCart, Tag)
+from recipes.relations import bulk_change
+from recipes.search import record_change
+from recipes.shopping_list import evict_document
+from recipes.tag_map import VERSION_NAME as TAGS_VERSION
+from users.models import User
+
+
+def is_pending(kwargs):
+    """Checks if an m2m_changed signal is sent before the change is made."""
+    return kwargs.get('action', '').startswith('pre_')
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def shopping_cart_changed(sender, instance, **kwargs):
+    """Evicts cached shopping list document when the cart changes."""
+    if bulk_change.get():
+        return
+    evict_document(instance.user_id)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    """Marks the ingredient search index as outdated after commit."""
+    transaction.on_commit(lambda: bump_version(INGREDIENTS_VERSION))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    """Reindexes the recipe in the in-memory search index after commit."""
+    recipe_id = instance.pk
+    transaction.on_commit(lambda: record_change(recipe_id))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_list_changed(sender, **kwargs):
+    """Invalidates cached totals of recipe lists.
+
+    Names and texts are searched and tags are filtered by, so any
+    change of a recipe may change them. Favorites and carts filters
+    put the ids into the query, which changes the cache key instead.
+    """
+    if is_pending(kwargs):
+        return
+    transaction.on_commit(lambda: bump_version(RECIPES_COUNT_VERSION))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=IngredientRecipe)
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def catalogue_changed(sender, **kwargs):
+    """Invalidates cached recipe list pages."""
+    if not is_pending(kwargs):
+        invalidate_lists()
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=IngredientRecipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_fragment_changed(sender, instance, **kwargs):
+    """Evicts cached fragments of changed recipes."""
+    if is_pending(kwargs):
+        return
+    if sender is IngredientRecipe:
+        evict_fragments((instance.recipe_id,))
+    elif not kwargs.get('reverse'):
+        evict_fragments((instance.pk,))
+    elif kwargs['pk_set'] is not None:
+        evict_fragments(kwargs['pk_set'])
+    else:
+        invalidate_fragments()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+def shared_data_changed(sender, **kwargs):
+    """Invalidates every fragment, since tags and ingredients are embedded."""
+    invalidate_fragments()
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    """Invalidates cached tag responses once the change is committed."""
+    transaction.on_commit(lambda: bump_version(TAGS_VERSION))
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+@receiver((post_save, post_delete), sender=Recipe)
+def update_counters(sender, instance, signal, **kwargs):
+    """Keeps denormalized favorites, carts and recipes counters current."""
+    if bulk_change.get() or (
+            signal is post_save and not kwargs['created']):
+        return
+    delta = 1 if signal is post_save else -1
+    if sender is Favorite:
+        change_counter(Recipe, instance.recipe_id, 'favorites_count', delta)
+    elif sender is ShoppingCart:
+        change_counter(Recipe, instance.recipe_id, 'in_carts_count', delta)
+    else:
+        change_counter(User, instance.author_id, 'recipes_count', delta)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def update_membership(sender, instance, signal, **kwargs):
+    """Invalidates cached favorite and shopping cart sets of the user."""
+    if bulk_change.get():
+        return
+    if signal is post_delete or kwargs['created']:
+        evict_memberships(instance.user_id)
+
+
+@receiver(post_save, sender=Recipe)
+def generate_image_variants(sender, instance, **kwargs):
+    """Queues resized copies of a new or replaced recipe image."""
+    image_name = instance.image.name
+    if image_name and image_name != instance.image_variants_source:
+        transaction.on_commit(
+            lambda: schedule_variants(instance.pk, image_name)
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def add_to_feeds(sender, instance, created, **kwargs):
+    """Fans a published recipe out to feeds of the author's followers."""
+    if created:
+        recipe_id, author_id = instance.pk, instance.author_id
+        transaction.on_commit(lambda: fan_out_recipe(recipe_id, author_id))
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from api.cache import get_version
+from foodgram.db_router import primary_reads
+from recipes.models import Tag
+
+VERSION_NAME = 'tags'
+TAG_IDS_KEY = 'tag_ids:{}'
+
+
+def get_tag_ids():
+    """Returns tag ids by slug, cached until the 'tags' version changes."""
+    key = TAG_IDS_KEY.format(get_version(VERSION_NAME))
+    tag_ids = cache.get(key)
+    if tag_ids is None:
+        with primary_reads():
+            tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, tag_ids, settings.REFERENCE_CACHE_TIMEOUT)
+    return tag_ids
+
+
+def get_tag_choices():
+    """Returns choices of tag slugs for filter forms."""
+    return [(slug, slug) for slug in get_tag_ids()]
@@ -1,40 +1,131 @@
-from django.db.models import Exists, OuterRef
-from django.http.response import HttpResponse
+import io
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.http.response import FileResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 
+from api.cache import get_last_modified, get_version
 from api.filters import IngredientFilter, RecipeFilter
-from api.paginator import CustomPaginator
+from api.paginator import KeysetPaginator, RecipePaginator
 from api.permissions import (IsAdminOrReadOnly, IsAuthorOrReadOnly,
                              IsModeratorOrReadOnly)
 from api.serializers import (CreateRecipeSerializer, FavoriteSerializer,
-                             IngredientSerializer, ShoppingCartSerializer,
-                             ShowRecipeSerializer, TagSerializer)
+                             IngredientSerializer, RecipeIdsSerializer,
+                             ShoppingCartSerializer, ShowRecipeSerializer,
+                             TagSerializer)
+from foodgram.db_router import primary_reads
+from recipes.feed import get_feed
+from recipes.ingredient_index import VERSION_NAME as INGREDIENTS_VERSION
+from recipes.ingredient_index import ingredient_index
+from recipes.list_cache import add_user_flags, get_list_key
+from recipes.membership import get_memberships
 from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
                             ShoppingCart, Tag)
+from recipes.relations import add_recipes, remove_recipes
+from recipes.shopping_list import (get_cart_digest, get_document,
+                                   get_shopping_list, get_user_document,
+                                   is_job_pending, remember_document,
+                                   render_document, submit_render_job)
+from recipes.tag_map import VERSION_NAME as TAGS_VERSION
+
+REFERENCE_KEY = 'reference:{}:{}:{}'
+
+
+def get_reference_state(name):
+    """Returns version, ETag and modification time of reference data."""
+    version = get_version(name)
+    etag = quote_etag(f'{name}-{version}')
+    return version, etag, get_last_modified(name)
+
+
+def set_reference_headers(response, etag, last_modified):
+    """Adds validators of reference data to the response."""
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
 
+class ReferenceCacheMixin:
+    """Mixin caching reference data responses by the data set version.
+
+    Responses carry ETag and Last-Modified headers of the version named
+    by 'cache_version_name', so clients revalidate them with 304 replies.
+    """
+    cache_version_name = None
+
+    def cached_response(self, view, request, *args, **kwargs):
+        """Method returns cached, not modified or fresh response."""
+        version, etag, last_modified = get_reference_state(
+            self.cache_version_name
+        )
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            key = REFERENCE_KEY.format(
+                self.cache_version_name, version, request.get_full_path()
+            )
+            data = cache.get(key)
+            if data is None:
+                with primary_reads():
+                    response = view(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache.set(
+                    key, response.data, settings.REFERENCE_CACHE_TIMEOUT
+                )
+            else:
+                response = Response(data)
+        return set_reference_headers(response, etag, last_modified)
 
-class TagViewSet(viewsets.ModelViewSet):
+    def list(self, request, *args, **kwargs):
+        """Method returns cached list of objects."""
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Method returns cached object."""
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class TagViewSet(ReferenceCacheMixin, viewsets.ModelViewSet):
     """Tags' model processing viewset."""
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [AllowAny]
+    cache_version_name = TAGS_VERSION
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ReferenceCacheMixin, viewsets.ReadOnlyModelViewSet):
     """Ingredients' model processing viewset."""
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
     permission_classes = [AllowAny]
     filter_backends = [IngredientFilter, ]
     search_fields = ['^name', ]
+    cache_version_name = INGREDIENTS_VERSION
+
+    def list(self, request, *args, **kwargs):
+        """Method serves name search from the in-memory index."""
+        name = request.query_params.get(IngredientFilter.search_param)
+        if not name:
+            return super().list(request, *args, **kwargs)
+        return self.cached_response(
+            lambda *args, **kwargs: Response(ingredient_index.search(
+                name, settings.INGREDIENT_SEARCH_LIMIT
+            )),
+            request, *args, **kwargs
+        )
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
@@ -44,27 +135,60 @@ class RecipeViewSet(viewsets.ModelViewSet):
         IsAuthenticatedOrReadOnly,
         IsAuthorOrReadOnly | IsModeratorOrReadOnly | IsAdminOrReadOnly
     ]
-    pagination_class = CustomPaginator
+    pagination_class = RecipePaginator
     filter_backends = [DjangoFilterBackend, ]
     filterset_class = RecipeFilter
+    shared_response = False
 
     def get_queryset(self):
-        """Method returns a queryset with required properties."""
-        user = self.request.user
-        if not user.is_anonymous:
-            is_favorited = Favorite.objects.filter(
-                user=user,
-                recipe=OuterRef('id')
-            )
-            is_in_shopping_cart = ShoppingCart.objects.filter(
-                user=user,
-                recipe=OuterRef('id')
-            )
-            return Recipe.objects.prefetch_related('ingredients').annotate(
-                is_favorited=Exists(is_favorited),
-                is_in_shopping_cart=Exists(is_in_shopping_cart)
-            )
-        return Recipe.objects.all()
+        """Method returns a queryset with required properties.
+
+        Reads load relations only for recipes missing in the fragment cache.
+        Writes fetch author, ingredient amounts and tags with a constant
+        number of queries. The queryset does not depend on the user,
+        per-user flags come from cached membership sets.
+        """
+        if self.request.method == 'GET':
+            return Recipe.objects.all()
+        queryset = Recipe.objects.select_related('author').prefetch_related(
+            Prefetch(
+                'ingredient_amount',
+                queryset=IngredientRecipe.objects.select_related('ingredient')
+            ),
+            Prefetch('tags', queryset=Tag.objects.all()),
+        )
+        return queryset
+
+    def get_serializer_context(self):
+        """Method adds user's favorites, cart and following sets.
+
+        Shared responses are rendered without them, as for an anonymous user.
+        """
+        context = super().get_serializer_context()
+        if not self.shared_response:
+            context.update(get_memberships(self.request.user))
+        return context
+
+    def list(self, request, *args, **kwargs):
+        """Method serves pages filtered by tags and author from the cache.
+
+        Cached pages are shared by every user, flags of the current user
+        are merged in. Counters in cached pages may lag behind by up to
+        RECIPE_LIST_CACHE_TIMEOUT seconds.
+        """
+        key = get_list_key(request)
+        if key is None:
+            return super().list(request, *args, **kwargs)
+        data = cache.get(key)
+        if data is None:
+            self.shared_response = True
+            with primary_reads():
+                response = super().list(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            cache.set(key, data, settings.RECIPE_LIST_CACHE_TIMEOUT)
+        return Response(add_user_flags(data, get_memberships(request.user)))
 
     def get_serializer_class(self):
         """Method chooses a serializer depending on the request type."""
@@ -75,46 +199,70 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(
         detail=False, methods=["GET"], permission_classes=[IsAuthenticated]
     )
-    def download_shopping_cart(self, request):
-        """Method of downloading a shopping cart."""
-        final_list = {}
-        ingredients = IngredientRecipe.objects.filter(
-            recipe__shopping_list__user=request.user
-        ).values_list(
-            "ingredient__name", "ingredient__measurement_unit", "amount"
-        )
-        for item in ingredients:
-            name = item[0]
-            if name not in final_list:
-                final_list[name] = {
-                    "measurement_unit": item[1],
-                    "amount": item[2],
-                }
-            else:
-                final_list[name]["amount"] += item[2]
-        pdfmetrics.registerFont(
-            TTFont("caviar-dreams", "data/caviar-dreams.ttf", "UTF-8")
-        )
-        response = HttpResponse(content_type="application/pdf")
-        response["Content-Disposition"] = (
-            "attachment; " 'filename="shopping_list.pdf"'
+    def feed(self, request):
+        """Method returns recipes of followed authors, newest first.
+
+        The feed is always paginated by keyset 'cursor' parameter.
+        """
+        queryset = self.filter_queryset(
+            get_feed(self.get_queryset(), request.user)
         )
-        page = canvas.Canvas(response)
-        page.setFont("caviar-dreams", size=20)
-        page.drawString(200, 800, "Список покупок")
-        page.setFont("caviar-dreams", size=16)
-        height = 700
-        for i, (name, data) in enumerate(final_list.items(), 1):
-            page.drawString(
-                75, height, (
-                    f'{i}. {name} - {data["amount"]} '
-                    f'{data["measurement_unit"]}'
-                ),
+        paginator = KeysetPaginator(RecipePaginator.cursor_ordering)
+        page = paginator.paginate_queryset(queryset, request, self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False, methods=["GET"], permission_classes=[IsAuthenticated]
+    )
+    def download_shopping_cart(self, request):
+        """Method of downloading a shopping cart.
+
+        Documents are cached by a hash of the cart contents. With 'async'
+        parameter a missing document is rendered by a worker process and
+        a job handle is returned; it is polled with 'job' parameter.
+        """
+        job = request.query_params.get('job')
+        if job is not None:
+            return self.shopping_cart_job(request, job)
+        ingredients = list(get_shopping_list(request.user))
+        digest = get_cart_digest(ingredients)
+        remember_document(request.user, digest)
+        document = get_document(digest)
+        if document is None:
+            if (request.query_params.get('async')
+                    and submit_render_job(digest, ingredients)):
+                return Response(
+                    {'job': digest, 'status': 'pending'},
+                    status=status.HTTP_202_ACCEPTED
+                )
+            document = render_document(digest, ingredients)
+        return self.shopping_cart_response(document)
+
+    @staticmethod
+    def shopping_cart_job(request, digest):
+        """Method returns a rendered document or the job status."""
+        if get_user_document(request.user) != digest:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        document = get_document(digest)
+        if document is not None:
+            return RecipeViewSet.shopping_cart_response(document)
+        if is_job_pending(digest):
+            return Response(
+                {'job': digest, 'status': 'pending'},
+                status=status.HTTP_202_ACCEPTED
             )
-            height -= 25
-        page.showPage()
-        page.save()
-        return response
+        return Response(status=status.HTTP_404_NOT_FOUND)
+
+    @staticmethod
+    def shopping_cart_response(document):
+        """Method wraps a shopping list document into a file response."""
+        return FileResponse(
+            io.BytesIO(document),
+            as_attachment=True,
+            filename='shopping_list.pdf',
+            content_type='application/pdf',
+        )
 
 
 class FavoritesShoppingCartBasicViewSet(viewsets.ModelViewSet):
@@ -145,6 +293,26 @@ class FavoritesShoppingCartBasicViewSet(viewsets.ModelViewSet):
         ).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def bulk_add(self, request, *args, **kwargs):
+        """Method adds many recipes, ones already added are skipped."""
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipes = serializer.validated_data['recipes']
+        added = add_recipes(self.model, request.user, recipes)
+        return Response(
+            {'added': added},
+            status=status.HTTP_201_CREATED if added else status.HTTP_200_OK
+        )
+
+    def bulk_remove(self, request, *args, **kwargs):
+        """Method removes many recipes with one query."""
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        remove_recipes(
+            self.model, request.user, serializer.validated_data['recipes']
+        )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 
 class FavoriteViewSet(FavoritesShoppingCartBasicViewSet):
     """Favourite recipes' model processing viewset."""
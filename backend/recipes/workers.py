@@ -0,0 +1,41 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    """Returns the local process pool running background jobs.
+
+    Workers are forked from the web process, so jobs may use settings
+    and storage but must not touch the inherited database connections.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.BACKGROUND_WORKERS,
+            mp_context=multiprocessing.get_context('fork'),
+        )
+    return _executor
+
+
+def submit(function, *args):
+    """Queues a job, replacing the pool once if it is broken.
+
+    A worker that died abruptly breaks the pool for good, so without
+    a new one every later job would fail until the process restarts.
+    """
+    global _executor
+    try:
+        return get_executor().submit(function, *args)
+    except BrokenProcessPool:
+        logger.warning('Пул фоновых процессов сломан, создаётся новый.')
+        _executor.shutdown(wait=False)
+        _executor = None
+        return get_executor().submit(function, *args)
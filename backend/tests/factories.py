@@ -0,0 +1,33 @@
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from users.models import User
+
+
+def create_user(username):
+    """Creates a user named after the username."""
+    return User.objects.create_user(
+        username=username, email=f'{username}@example.com',
+        password='password', first_name=username, last_name=username,
+    )
+
+
+def create_tag(slug, color):
+    """Creates a tag named after the slug."""
+    return Tag.objects.create(name=slug, color=color, slug=slug)
+
+
+def create_recipe(author, name, tags=(), ingredients=()):
+    """Creates a recipe with tags and one unit of each ingredient."""
+    recipe = Recipe.objects.create(
+        author=author, name=name, text=f'{name} text', cooking_time=10
+    )
+    recipe.tags.set(tags)
+    IngredientRecipe.objects.bulk_create(
+        IngredientRecipe(recipe=recipe, ingredient=ingredient, amount=1)
+        for ingredient in ingredients
+    )
+    return recipe
+
+
+def create_ingredient(name):
+    """Creates an ingredient measured in grams."""
+    return Ingredient.objects.create(name=name, measurement_unit='г')
@@ -0,0 +1,47 @@
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.authentication import CachedTokenAuthentication
+from tests.factories import create_user
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Token owners are cached only in a cache shared by workers."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user('cook')
+        self.token = Token.objects.create(user=self.user)
+        self.authentication = CachedTokenAuthentication()
+
+    def authenticate(self):
+        """Returns the user and the token authenticated by the key."""
+        return self.authentication.authenticate_credentials(self.token.key)
+
+    def test_process_cache_reads_database(self):
+        self.authenticate()
+        with self.assertNumQueries(1):
+            user, token = self.authenticate()
+        self.assertEqual(user, self.user)
+        self.assertIsInstance(token, Token)
+
+    def test_shared_cache_keeps_tokens(self):
+        with tempfile.TemporaryDirectory() as location, override_settings(
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.'
+                           'FileBasedCache',
+                'LOCATION': location,
+            }}
+        ):
+            self.authenticate()
+            with self.assertNumQueries(0):
+                user, token = self.authenticate()
+            self.assertEqual(user, self.user)
+            self.assertEqual(token, self.token)
+            self.token.delete()
+            with self.assertRaises(AuthenticationFailed):
+                self.authenticate()
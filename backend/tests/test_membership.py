@@ -0,0 +1,54 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase
+
+from recipes.membership import (MEMBERSHIPS, get_membership,
+                                get_membership_keys, get_memberships)
+from recipes.models import Favorite, ShoppingCart
+from tests.factories import create_recipe, create_user
+from users.models import Follow
+
+
+class MembershipCacheTests(TestCase):
+    """Cached favorites, cart and following sets of a user."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user('cook')
+        self.author = create_user('chef')
+        self.recipe = create_recipe(self.author, 'Борщ')
+
+    def test_changes_are_visible_after_commit(self):
+        self.assertEqual(get_memberships(self.user), {
+            name: frozenset() for name in MEMBERSHIPS
+        })
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(user=self.user, recipe=self.recipe)
+            ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+            Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(get_memberships(self.user), {
+            'favorites': {self.recipe.id},
+            'shopping_list': {self.recipe.id},
+            'following': {self.author.id},
+        })
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.filter(user=self.user).delete()
+        self.assertEqual(get_membership(self.user, 'favorites'), set())
+
+    def test_rolled_back_change_is_not_cached(self):
+        get_membership(self.user, 'favorites')
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Favorite.objects.create(user=self.user, recipe=self.recipe)
+                raise RuntimeError
+        self.assertEqual(get_membership(self.user, 'favorites'), set())
+
+    def test_set_loaded_before_commit_is_not_served(self):
+        get_membership(self.user, 'favorites')
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(user=self.user, recipe=self.recipe)
+            key = get_membership_keys(self.user.id, ('favorites',))
+            cache.set(key['favorites'], frozenset())
+        self.assertEqual(
+            get_membership(self.user, 'favorites'), {self.recipe.id}
+        )
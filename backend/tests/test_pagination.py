@@ -0,0 +1,121 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.cache import get_version
+from api.paginator import RECIPES_COUNT_VERSION
+from recipes.models import Recipe
+from tests.factories import create_recipe, create_user
+
+
+class CountCacheTests(TestCase):
+    """Cached totals of paginated lists follow writes changing them."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = create_user('chef')
+        self.reader = create_user('cook')
+        self.recipes = [
+            create_recipe(self.author, f'Рецепт {number}')
+            for number in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def write(self, method, url, data=None):
+        """Sends a write request, running on-commit invalidations."""
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, method)(url, data, format='json')
+
+    def get_count(self, url):
+        """Returns the total reported by a paginated list."""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data['count']
+
+    def test_recipe_count(self):
+        by_author = f'/api/recipes/?author={self.author.id}'
+        search = '/api/recipes/?search=рецепт'
+        self.assertEqual(self.get_count(by_author), 3)
+        self.assertEqual(self.get_count(search), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_recipe(self.author, 'Рецепт 3')
+        self.assertEqual(self.get_count(by_author), 4)
+        self.assertEqual(self.get_count(search), 4)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipes[0].delete()
+        self.assertEqual(self.get_count(by_author), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipes[1].name = self.recipes[1].text = 'Суп'
+            self.recipes[1].save()
+        self.assertEqual(self.get_count(search), 2)
+
+    def test_favorites_count_without_version_bump(self):
+        url = '/api/recipes/?is_favorited=1'
+        self.assertEqual(self.get_count(url), 0)
+        version = get_version(RECIPES_COUNT_VERSION)
+        self.write('post', f'/api/recipes/{self.recipes[0].id}/favorite/')
+        self.write('post', '/api/recipes/favorite/', {
+            'recipes': [self.recipes[1].id, self.recipes[2].id],
+        })
+        self.assertEqual(self.get_count(url), 3)
+        self.write('delete', '/api/recipes/favorite/', {
+            'recipes': [self.recipes[1].id],
+        })
+        self.assertEqual(self.get_count(url), 2)
+        self.assertEqual(get_version(RECIPES_COUNT_VERSION), version)
+
+    def test_user_and_subscription_counts(self):
+        self.assertEqual(self.get_count('/api/users/'), 2)
+        self.assertEqual(self.get_count('/api/users/subscriptions/'), 0)
+        self.write('post', f'/api/users/{self.author.id}/subscribe/')
+        self.assertEqual(self.get_count('/api/users/subscriptions/'), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_user('baker')
+        self.assertEqual(self.get_count('/api/users/'), 3)
+        self.write('delete', f'/api/users/{self.author.id}/subscribe/')
+        self.assertEqual(self.get_count('/api/users/subscriptions/'), 0)
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor pages follow the ordering of numbered pages."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = create_user('chef')
+        for number in range(8):
+            create_recipe(self.author, f'Рецепт {number}')
+        Recipe.objects.filter(id__lte=4).update(pub_date=timezone.now())
+        self.client = APIClient()
+
+    def walk(self, url):
+        """Returns ids of every page following 'next' links."""
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            ids.extend(recipe['id'] for recipe in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_pages_match_numbered_ordering(self):
+        listed = self.client.get('/api/recipes/?limit=100').data['results']
+        ids = self.walk('/api/recipes/?cursor=&limit=3')
+        self.assertEqual(ids, [recipe['id'] for recipe in listed])
+        self.assertEqual(len(ids), 8)
+
+    def test_insert_does_not_shift_pages(self):
+        first = self.client.get('/api/recipes/?cursor=&limit=3').data
+        create_recipe(self.author, 'Новый')
+        following = self.walk(first['next'])
+        self.assertEqual(len(following), 5)
+        self.assertFalse(
+            {recipe['id'] for recipe in first['results']} & set(following)
+        )
+
+    def test_invalid_cursor(self):
+        for cursor in ('garbage', 'WzFd'):
+            response = self.client.get(f'/api/recipes/?cursor={cursor}')
+            self.assertEqual(response.status_code, 404)
@@ -0,0 +1,177 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.serializers import FavoritesCartBasicSerializer
+from recipes.models import Favorite, Recipe
+from tests.factories import (create_ingredient, create_recipe, create_tag,
+                             create_user)
+
+
+class RecipeCacheTests(TestCase):
+    """Cached recipe pages, fragments and per-user flags stay current."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = create_user('chef')
+        self.reader = create_user('cook')
+        self.salt = create_ingredient('Соль')
+        self.recipe = create_recipe(
+            self.author, 'Борщ', ingredients=[self.salt]
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+        self.anonymous = APIClient()
+
+    def write(self, method, url, data=None):
+        """Sends a write request, running on-commit invalidations."""
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, method)(url, data, format='json')
+
+    def get_listed(self, client=None):
+        """Returns the recipe as shown in the recipe list."""
+        response = (client or self.client).get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results'][0]
+
+    def get_detail(self):
+        """Returns the recipe detail."""
+        response = self.client.get(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_flags_follow_favorites_and_cart(self):
+        for path, flag in (('favorite', 'is_favorited'),
+                           ('shopping_cart', 'is_in_shopping_cart')):
+            url = f'/api/recipes/{self.recipe.id}/{path}/'
+            self.assertFalse(self.get_listed()[flag])
+            self.assertEqual(self.write('post', url).status_code, 201)
+            self.assertTrue(self.get_listed()[flag])
+            self.assertTrue(self.get_detail()[flag])
+            self.assertEqual(self.write('delete', url).status_code, 204)
+            self.assertFalse(self.get_listed()[flag])
+            self.assertFalse(self.get_detail()[flag])
+
+    def test_flags_follow_bulk_changes(self):
+        data = {'recipes': [self.recipe.id]}
+        self.get_listed()
+        self.write('post', '/api/recipes/favorite/', data)
+        self.assertTrue(self.get_listed()['is_favorited'])
+        self.write('delete', '/api/recipes/favorite/', data)
+        self.assertFalse(self.get_listed()['is_favorited'])
+
+    def test_subscription_flag(self):
+        url = f'/api/users/{self.author.id}/subscribe/'
+        self.assertFalse(self.get_listed()['author']['is_subscribed'])
+        self.assertEqual(self.write('post', url).status_code, 201)
+        self.assertTrue(self.get_listed()['author']['is_subscribed'])
+        self.assertEqual(self.write('delete', url).status_code, 204)
+        self.assertFalse(self.get_listed()['author']['is_subscribed'])
+
+    def test_shared_page_has_no_flags_of_other_users(self):
+        self.write('post', f'/api/recipes/{self.recipe.id}/favorite/')
+        self.assertTrue(self.get_listed()['is_favorited'])
+        self.assertFalse(self.get_listed(self.anonymous)['is_favorited'])
+
+    def test_update_evicts_fragments_and_pages(self):
+        self.get_listed(self.anonymous)
+        self.get_detail()
+        pepper = create_ingredient('Перец')
+        self.client.force_authenticate(self.author)
+        response = self.write('patch', f'/api/recipes/{self.recipe.id}/', {
+            'name': 'Щи',
+            'ingredients': [{'id': pepper.id, 'amount': 2}],
+        })
+        self.assertEqual(response.status_code, 200)
+        for recipe in (self.get_listed(self.anonymous), self.get_detail()):
+            self.assertEqual(recipe['name'], 'Щи')
+            self.assertEqual(
+                [(row['id'], row['amount']) for row in recipe['ingredients']],
+                [(pepper.id, 2)]
+            )
+
+    def test_author_change_evicts_fragments(self):
+        self.get_listed(self.anonymous)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.first_name = 'Пётр'
+            self.author.save()
+        self.assertEqual(
+            self.get_listed(self.anonymous)['author']['first_name'], 'Пётр'
+        )
+
+    def test_shared_data_change_evicts_fragments(self):
+        self.get_detail()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.salt.name = 'Морская соль'
+            self.salt.save()
+        self.assertEqual(
+            self.get_detail()['ingredients'][0]['name'], 'Морская соль'
+        )
+
+
+class DuplicateRelationTests(TestCase):
+    """A relation created by a concurrent request is reported, not raised."""
+
+    def setUp(self):
+        self.reader = create_user('cook')
+        self.recipe = create_recipe(create_user('chef'), 'Борщ')
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def test_duplicate_passing_validation(self):
+        Favorite.objects.create(user=self.reader, recipe=self.recipe)
+        with mock.patch.object(
+            FavoritesCartBasicSerializer, 'validate',
+            lambda serializer, data: data
+        ):
+            response = self.client.post(
+                f'/api/recipes/{self.recipe.id}/favorite/'
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'status': ['Уже существует!']})
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe.pk).favorites_count, 1
+        )
+
+
+class TagFilterTests(TestCase):
+    """Filtering recipes by any or every of the tags."""
+
+    def setUp(self):
+        cache.clear()
+        author = create_user('chef')
+        breakfast = create_tag('breakfast', '#E26C2D')
+        lunch = create_tag('lunch', '#49B64E')
+        self.both = create_recipe(author, 'Омлет', tags=[breakfast, lunch])
+        self.breakfast = create_recipe(author, 'Каша', tags=[breakfast])
+        self.lunch = create_recipe(author, 'Суп', tags=[lunch])
+        create_recipe(author, 'Чай')
+        self.client = APIClient()
+
+    def get_ids(self, query):
+        """Returns ids of recipes listed for the query."""
+        response = self.client.get(f'/api/recipes/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return {recipe['id'] for recipe in response.data['results']}
+
+    def test_any_tag(self):
+        self.assertEqual(
+            self.get_ids('tags=breakfast&tags=lunch'),
+            {self.both.id, self.breakfast.id, self.lunch.id}
+        )
+
+    def test_every_tag(self):
+        self.assertEqual(
+            self.get_ids('tags=breakfast&tags=lunch&tags_mode=all'),
+            {self.both.id}
+        )
+        self.assertEqual(
+            self.get_ids('tags=breakfast&tags=breakfast&tags_mode=all'),
+            {self.both.id, self.breakfast.id}
+        )
+
+    def test_unknown_mode_is_rejected(self):
+        response = self.client.get('/api/recipes/?tags=lunch&tags_mode=some')
+        self.assertEqual(response.status_code, 400)
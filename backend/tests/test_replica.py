@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db.utils import ConnectionDoesNotExist
+from django.test import TestCase
+
+from api.paginator import USERS_COUNT_VERSION, get_cached_count
+from foodgram.db_router import REPLICA, read_database
+from recipes.ingredient_index import ingredient_index
+from recipes.membership import get_membership
+from recipes.models import Favorite, Tag
+from recipes.search import recipe_search_index
+from recipes.tag_map import get_tag_ids
+from tests.factories import (create_ingredient, create_recipe, create_tag,
+                             create_user)
+from users.models import User
+
+
+class ReplicaRefillTests(TestCase):
+    """Caches refilled after a write ignore the replica.
+
+    The replica alias is not defined in tests, so every read routed
+    to it fails and a refill passes only if it reads the primary.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user('cook')
+        patcher = mock.patch(
+            'foodgram.db_router.replica_configured', return_value=True
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def read_from_replica(self):
+        """Routes reads of the test to the replica until it ends."""
+        token = read_database.set(REPLICA)
+        self.addCleanup(read_database.reset, token)
+
+    def test_reads_are_routed_to_replica(self):
+        self.read_from_replica()
+        with self.assertRaises(ConnectionDoesNotExist):
+            Tag.objects.count()
+
+    def test_tag_ids(self):
+        get_tag_ids()
+        with self.captureOnCommitCallbacks(execute=True):
+            create_tag('breakfast', '#E26C2D')
+        self.read_from_replica()
+        self.assertIn('breakfast', get_tag_ids())
+
+    def test_ingredient_index(self):
+        ingredient_index.search('соль', 10)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_ingredient('Соль')
+        self.read_from_replica()
+        self.assertEqual(
+            [row['name'] for row in ingredient_index.search('соль', 10)],
+            ['Соль']
+        )
+
+    def test_recipe_search_index(self):
+        recipe_search_index.search('борщ')
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = create_recipe(self.user, 'Борщ')
+        self.read_from_replica()
+        self.assertIn(recipe.id, recipe_search_index.search('борщ'))
+
+    def test_membership(self):
+        recipe = create_recipe(self.user, 'Борщ')
+        Favorite.objects.create(user=self.user, recipe=recipe)
+        self.read_from_replica()
+        self.assertEqual(
+            get_membership(self.user, 'favorites'), {recipe.id}
+        )
+
+    def test_count(self):
+        self.read_from_replica()
+        self.assertEqual(
+            get_cached_count(User.objects.all(), USERS_COUNT_VERSION), 1
+        )
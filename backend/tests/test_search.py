@@ -0,0 +1,51 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.search import recipe_search_index
+from tests.factories import create_recipe, create_user
+
+
+class RecipeSearchIndexTests(TestCase):
+    """The in-memory index reindexes only changed recipes."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user('cook')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.soup = create_recipe(self.user, 'Борщ')
+            self.stew = create_recipe(self.user, 'Рагу')
+        recipe_search_index.search('борщ')
+
+    def test_changed_recipe_is_reindexed_alone(self):
+        self.soup.name = self.soup.text = 'Щи'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.soup.save()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(recipe_search_index.search('борщ'), {})
+        self.assertEqual(len(queries), 1)
+        self.assertIn(f'IN ({self.soup.id})', queries[0]['sql'])
+        self.assertIn(self.soup.id, recipe_search_index.search('щи'))
+        self.assertIn(self.stew.id, recipe_search_index.search('рагу'))
+
+    def test_deleted_recipe_is_removed(self):
+        recipe_id = self.soup.id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.soup.delete()
+        self.assertNotIn(recipe_id, recipe_search_index.search('борщ'))
+
+    def test_results_are_limited(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            newer = create_recipe(self.user, 'Борщ зелёный')
+        self.assertEqual(
+            recipe_search_index.top('борщ', 1), {newer.id: 2}
+        )
+        client = APIClient()
+        with override_settings(RECIPE_SEARCH_LIMIT=1):
+            response = client.get('/api/recipes/?search=борщ')
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [newer.id]
+        )
@@ -0,0 +1,22 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from tests.factories import create_user
+
+
+class SubscribeTests(TestCase):
+    """Subscribing returns the author with the new follower counted."""
+
+    def setUp(self):
+        self.author = create_user('chef')
+        self.client = APIClient()
+        self.client.force_authenticate(create_user('cook'))
+
+    def test_followers_count(self):
+        url = f'/api/users/{self.author.id}/subscribe/'
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['followers_count'], 1)
+        other = APIClient()
+        other.force_authenticate(create_user('baker'))
+        self.assertEqual(other.post(url).data['followers_count'], 2)
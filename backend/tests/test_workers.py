@@ -0,0 +1,44 @@
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from recipes import images, shopping_list, workers
+
+
+class BrokenPoolTests(SimpleTestCase):
+    """Jobs survive a broken pool and never fail the caller."""
+
+    def setUp(self):
+        patcher = mock.patch.object(workers, '_executor', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_broken_pool_is_replaced(self):
+        broken = mock.Mock()
+        broken.submit.side_effect = BrokenProcessPool()
+        fresh = mock.Mock()
+        with mock.patch.object(
+            workers, 'ProcessPoolExecutor', side_effect=[broken, fresh]
+        ):
+            with self.assertLogs('recipes.workers', 'WARNING'):
+                future = workers.submit(print, 'job')
+        self.assertIs(future, fresh.submit.return_value)
+        broken.shutdown.assert_called_once_with(wait=False)
+        self.assertIs(workers._executor, fresh)
+
+    def test_failed_variants_are_logged(self):
+        with mock.patch.object(
+            images, 'submit', side_effect=BrokenProcessPool()
+        ):
+            with self.assertLogs('recipes.images', 'ERROR'):
+                images.schedule_variants(1, 'recipes/image/missing.png')
+
+    def test_failed_render_job_is_reported(self):
+        with mock.patch.object(
+            shopping_list, 'submit', side_effect=BrokenProcessPool()
+        ):
+            with self.assertLogs('recipes.shopping_list', 'ERROR'):
+                queued = shopping_list.submit_render_job('digest', [])
+        self.assertFalse(queued)
+        self.assertFalse(shopping_list.is_job_pending('digest'))
@@ -25,6 +25,16 @@ class User(AbstractUser):
         unique=True,
         verbose_name='email'
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Рецептов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Подписчиков'
+    )
 
     class Meta:
         """Model's meta parameters."""
@@ -0,0 +1,93 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from api.authentication import evict_tokens
+from api.cache import bump_version
+from api.paginator import SUBSCRIPTIONS_COUNT_VERSION, USERS_COUNT_VERSION
+from recipes.counters import change_counter
+from recipes.feed import follow_added, follow_removed
+from recipes.fragments import evict_fragments
+from recipes.list_cache import invalidate_lists
+from recipes.membership import evict_memberships
+from recipes.models import Recipe
+from users.models import Follow, User
+
+
+@receiver((post_save, post_delete), sender=User)
+@receiver((post_save, post_delete), sender=Follow)
+def user_list_changed(sender, signal, **kwargs):
+    """Invalidates cached totals of users or subscriptions lists.
+
+    Only created and deleted rows change the totals.
+    """
+    if signal is post_save and not kwargs['created']:
+        return
+    bump_version(
+        USERS_COUNT_VERSION if sender is User
+        else SUBSCRIPTIONS_COUNT_VERSION
+    )
+
+
+@receiver((post_save, post_delete), sender=Follow)
+def update_followers_count(sender, instance, signal, **kwargs):
+    """Keeps denormalized followers counter current."""
+    if signal is post_save and not kwargs['created']:
+        return
+    delta = 1 if signal is post_save else -1
+    change_counter(User, instance.author_id, 'followers_count', delta)
+
+
+@receiver((post_save, post_delete), sender=Follow)
+def update_feed(sender, instance, signal, **kwargs):
+    """Backfills or cleans the feed after the followers counter changed."""
+    user_id, author_id = instance.user_id, instance.author_id
+    if signal is post_delete:
+        transaction.on_commit(lambda: follow_removed(user_id, author_id))
+    elif kwargs['created']:
+        transaction.on_commit(lambda: follow_added(user_id, author_id))
+
+
+@receiver((post_save, post_delete), sender=Follow)
+def update_following(sender, instance, signal, **kwargs):
+    """Invalidates cached set of followed authors."""
+    if signal is post_delete or kwargs['created']:
+        evict_memberships(instance.user_id)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Evicts cached owner of a deleted token on logout."""
+    evict_tokens((instance.key,))
+
+
+@receiver((post_save, post_delete), sender=User)
+def user_changed(sender, instance, **kwargs):
+    """Evicts cached user of every token.
+
+    Covers password changes, deactivation and deletion, but not
+    'last_login' updates made on every login.
+    """
+    if kwargs.get('update_fields') == frozenset(('last_login',)):
+        return
+    evict_tokens(
+        Token.objects.filter(user_id=instance.pk).values_list('key', flat=True)
+    )
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, **kwargs):
+    """Evicts cached recipes of the user, as the author is embedded in them.
+
+    New users have no recipes, and deleted users take theirs along.
+    """
+    if created or kwargs.get('update_fields') == frozenset(('last_login',)):
+        return
+    recipe_ids = list(
+        Recipe.objects.filter(author=instance).values_list('id', flat=True)
+    )
+    if recipe_ids:
+        evict_fragments(recipe_ids)
+        invalidate_lists()
@@ -1,21 +1,63 @@
-from django.db.models import Exists, OuterRef
+from django.db.models import (BooleanField, Exists, F, OuterRef, Prefetch,
+                              Value, Window, prefetch_related_objects)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from api.paginator import CustomPaginator
+from api.paginator import UserPaginator
 from api.serializers import ShowSubscriptionsSerializer, UserSerializer
+from recipes.models import Recipe
 from users.models import Follow, User
 
 
+def get_recipes_limit(request):
+    """Returns validated 'recipes_limit' parameter or None."""
+    recipes_limit = request.query_params.get('recipes_limit')
+    if recipes_limit is None:
+        return None
+    if not recipes_limit.isdigit():
+        raise ValidationError({
+            'recipes_limit': 'Должно быть целым неотрицательным числом.'
+        })
+    return int(recipes_limit)
+
+
+def get_limited_recipes(authors, recipes_limit):
+    """Returns a queryset of first recipes of every author.
+
+    Recipes are numbered with ROW_NUMBER window partitioned by author,
+    so the whole page of authors is served by a single query.
+    """
+    ranked = Recipe.objects.filter(author__in=authors).annotate(
+        row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('author')],
+            order_by=[F('pub_date').desc(), F('id').desc()],
+        )
+    ).values('id', 'row_number')
+    sql, params = ranked.query.sql_with_params()
+    return Recipe.objects.filter(id__in=RawSQL(
+        f'SELECT ranked.id FROM ({sql}) ranked '
+        'WHERE ranked.row_number <= %s',
+        (*params, recipes_limit),
+    ))
+
+
 class UserViewSet(UserViewSet):
     """Users' model processing viewset."""
     serializer_class = UserSerializer
-    pagination_class = CustomPaginator
+    pagination_class = UserPaginator
     permission_classes = [IsAuthenticated]
+    filter_backends = [OrderingFilter, ]
+    ordering_fields = ('username', 'recipes_count', 'followers_count',)
+    ordering = ('username',)
 
     def get_queryset(self):
         """Method returns a queryset with required properties."""
@@ -34,10 +76,14 @@ class UserViewSet(UserViewSet):
 
         if request.method == 'POST':
             serializer = ShowSubscriptionsSerializer(
-                author, data=request.data, context={'request': request}
+                author, data=request.data, context={
+                    'request': request,
+                    'recipes_limit': get_recipes_limit(request),
+                }
             )
             serializer.is_valid(raise_exception=True)
             Follow.objects.create(user=user, author=author)
+            author.refresh_from_db(fields=['followers_count'])
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if request.method == 'DELETE':
@@ -51,8 +97,19 @@ class UserViewSet(UserViewSet):
     def subscriptions(self, request):
         """Method shows user's subscriptions."""
         user = request.user
-        queryset = User.objects.filter(following__user=user)
+        recipes_limit = get_recipes_limit(request)
+        queryset = self.filter_queryset(
+            User.objects.filter(following__user=user).annotate(
+                is_subscribed=Value(True, output_field=BooleanField())
+            )
+        )
         pages = self.paginate_queryset(queryset)
+        recipes = Recipe.objects.all()
+        if recipes_limit is not None:
+            recipes = get_limited_recipes(pages, recipes_limit)
+        prefetch_related_objects(pages, Prefetch(
+            'recipes', queryset=recipes, to_attr='page_recipes'
+        ))
         serializer = ShowSubscriptionsSerializer(
             pages, many=True, context={'request': request}
         )